@@ -0,0 +1,35 @@
+"""messages history index
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 12:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Legacy rows were stamped with CURRENT_TIMESTAMP (no fractional part) while new
+    # rows are written by SQLAlchemy with microseconds; keyset cursors compare sent_at
+    # as text on SQLite, so both have to share one format.
+    op.execute(sa.text("UPDATE messages SET sent_at = CURRENT_TIMESTAMP WHERE sent_at IS NULL"))
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute(sa.text("UPDATE messages SET sent_at = strftime('%Y-%m-%d %H:%M:%f000', sent_at) "
+                           "WHERE length(sent_at) = 19"))
+    op.create_index('ix_messages_session_id_sent_at_id', 'messages', ['session_id', 'sent_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_messages_session_id_sent_at_id', table_name='messages')
@@ -0,0 +1,77 @@
+"""messages full-text search
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def indexed_text(row: str) -> str:
+    # U+E000/U+E001 mark snippet matches; stored copies become U+E002/U+E003
+    return f"replace(replace({row}.text, char(57344), char(57346)), char(57345), char(57347))"
+
+
+SQLITE_UPGRADE = [
+    f"""CREATE VIEW messages_search AS
+       SELECT messages.id AS id, {indexed_text('messages')} AS text, sessions.user_id AS user_id
+       FROM messages JOIN sessions ON sessions.id = messages.session_id""",
+    """CREATE VIRTUAL TABLE messages_fts USING fts5(
+       text, user_id, content='messages_search', content_rowid='id', tokenize='unicode61')""",
+    f"""CREATE TRIGGER messages_fts_insert AFTER INSERT ON messages BEGIN
+       INSERT INTO messages_fts(rowid, text, user_id)
+       SELECT new.id, {indexed_text('new')}, user_id FROM sessions WHERE id = new.session_id;
+       END""",
+    f"""CREATE TRIGGER messages_fts_delete AFTER DELETE ON messages BEGIN
+       INSERT INTO messages_fts(messages_fts, rowid, text, user_id)
+       SELECT 'delete', old.id, {indexed_text('old')}, user_id FROM sessions WHERE id = old.session_id;
+       END""",
+    f"""CREATE TRIGGER messages_fts_update AFTER UPDATE OF text, session_id ON messages BEGIN
+       INSERT INTO messages_fts(messages_fts, rowid, text, user_id)
+       SELECT 'delete', old.id, {indexed_text('old')}, user_id FROM sessions WHERE id = old.session_id;
+       INSERT INTO messages_fts(rowid, text, user_id)
+       SELECT new.id, {indexed_text('new')}, user_id FROM sessions WHERE id = new.session_id;
+       END""",
+    # Index the messages that already exist
+    "INSERT INTO messages_fts(messages_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DOWNGRADE = [
+    "DROP TRIGGER IF EXISTS messages_fts_update",
+    "DROP TRIGGER IF EXISTS messages_fts_delete",
+    "DROP TRIGGER IF EXISTS messages_fts_insert",
+    "DROP TABLE IF EXISTS messages_fts",
+    "DROP VIEW IF EXISTS messages_search",
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_UPGRADE:
+            op.execute(sa.text(statement))
+    elif dialect == 'postgresql':
+        op.execute(sa.text("CREATE INDEX ix_messages_text_fts ON messages "
+                           "USING gin (to_tsvector('russian', text))"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for statement in SQLITE_DOWNGRADE:
+            op.execute(sa.text(statement))
+    elif dialect == 'postgresql':
+        op.execute(sa.text("DROP INDEX IF EXISTS ix_messages_text_fts"))
@@ -0,0 +1,51 @@
+"""sessions listing columns
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Plain ADD COLUMN rather than a batch copy: on SQLite the batch table swap would
+    # break the messages_search view and the FTS triggers that reference sessions.
+    op.add_column('sessions', sa.Column('message_count', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('sessions', sa.Column('last_message_text', sa.String(), nullable=True))
+    op.add_column('sessions', sa.Column('last_message_at', sa.DateTime(), nullable=True))
+
+    # created_date used to come from CURRENT_TIMESTAMP; keyset cursors need the
+    # same text format SQLAlchemy writes (see 0002 for sent_at).
+    op.execute(sa.text("UPDATE sessions SET created_date = CURRENT_TIMESTAMP WHERE created_date IS NULL"))
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute(sa.text("UPDATE sessions SET created_date = strftime('%Y-%m-%d %H:%M:%f000', created_date) "
+                           "WHERE length(created_date) = 19"))
+
+    op.execute(sa.text(
+        "UPDATE sessions SET "
+        "message_count = (SELECT count(*) FROM messages WHERE messages.session_id = sessions.id), "
+        "last_message_text = (SELECT substr(text, 1, 120) FROM messages WHERE messages.session_id = sessions.id "
+        "                     ORDER BY sent_at DESC, id DESC LIMIT 1), "
+        "last_message_at = (SELECT max(sent_at) FROM messages WHERE messages.session_id = sessions.id)"
+    ))
+    op.create_index('ix_sessions_user_id_created_date_id', 'sessions', ['user_id', 'created_date', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_sessions_user_id_created_date_id', table_name='sessions')
+    op.drop_column('sessions', 'last_message_at')
+    op.drop_column('sessions', 'last_message_text')
+    op.drop_column('sessions', 'message_count')
@@ -0,0 +1,37 @@
+"""messages client message id
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Plain ADD COLUMN for the same reason as in 0004: a batch copy of messages
+    # would drop the FTS triggers. A bot reply carries the key of its user turn,
+    # so the key is unique per sender; unkeyed rows stay out of the index.
+    op.add_column('messages', sa.Column('client_message_id', sa.String(), nullable=True))
+    op.create_index('ux_messages_session_id_client_message_id_sender_type', 'messages',
+                    ['session_id', 'client_message_id', 'sender_type'],
+                    unique=True,
+                    sqlite_where=sa.text('client_message_id IS NOT NULL'),
+                    postgresql_where=sa.text('client_message_id IS NOT NULL'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ux_messages_session_id_client_message_id_sender_type', table_name='messages')
+    op.drop_column('messages', 'client_message_id')
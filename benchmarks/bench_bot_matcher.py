@@ -0,0 +1,44 @@
+"""Per-message cost of the intent matcher as the catalogue grows.
+
+    python -m benchmarks.bench_bot_matcher
+"""
+import random
+import string
+import timeit
+
+from src.services.matcher import Intent, IntentMatcher
+
+
+MESSAGES = [
+    "Привет! Покажите, пожалуйста, меню на сегодня",
+    "Сколько стоит доставка до улицы Донской?",
+    "какой у вас адрес",
+    "просто длинное сообщение без ключевых слов " * 5,
+]
+
+
+def synthetic_catalogue(size: int, seed: int = 42) -> list[Intent]:
+    rng = random.Random(seed)
+    alphabet = "абвгдежзийклмнопрстуфхцчшщэюя" + string.ascii_lowercase
+    intents = []
+    for priority in range(size):
+        keywords = tuple("".join(rng.choices(alphabet, k=rng.randint(4, 10))) for _ in range(3))
+        intents.append(Intent(name=f"intent_{priority}", keywords=keywords, answer="...", priority=priority))
+    intents.append(Intent(name="menu", keywords=("меню",), answer="...", priority=size))
+    return intents
+
+
+def main():
+    number = 2000
+    print(f"{'intents':>8} | {'compile, ms':>12} | {'per message, us':>16}")
+    for size in (10, 100, 500, 1000):
+        catalogue = synthetic_catalogue(size)
+        compile_seconds = timeit.timeit(lambda: IntentMatcher(catalogue), number=1)
+        matcher = IntentMatcher(catalogue)
+        seconds = timeit.timeit(lambda: [matcher.match(message) for message in MESSAGES], number=number)
+        per_message_us = seconds / (number * len(MESSAGES)) * 1e6
+        print(f"{size:>8} | {compile_seconds * 1e3:>12.2f} | {per_message_us:>16.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Requests/sec of POST /chat/message at fixed concurrency.
+
+    python -m benchmarks.bench_chat_message [--requests 400] [--concurrency 20]
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import bench_client, percentiles, register_and_login
+
+
+async def run(requests: int, concurrency: int) -> dict[str, float]:
+    async with bench_client() as client:
+        headers = await register_and_login(client, "bench_user")
+        session_ids = [(await client.post("/chat/session", headers=headers)).json()["id"]
+                       for _ in range(concurrency)]
+        latencies: list[float] = []
+        remaining = iter(range(requests))
+
+        async def worker(session_id: str):
+            for _ in remaining:
+                started = time.perf_counter()
+                response = await client.post("/chat/message", headers=headers,
+                                             json={"session_id": session_id, "sender_type": "user", "text": "Покажите меню"})
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(session_id) for session_id in session_ids))
+        elapsed = time.perf_counter() - started
+
+    result = {name: value * 1000 for name, value in percentiles(latencies).items()}
+    result["rps"] = len(latencies) / elapsed
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.requests, args.concurrency))
+    print(f"requests={args.requests} concurrency={args.concurrency} "
+          f"rps={result['rps']:.1f} p50={result['p50']:.1f}ms p95={result['p95']:.1f}ms p99={result['p99']:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Time to first response of a freshly started server, with and without warm startup.
+
+Launches ``python -m src.server`` as a subprocess against a seeded SQLite file
+and measures how long it takes until the port answers, then the latency of
+the first login and the first chat message, which pay for whatever the
+startup did not prepare.
+
+    python -m benchmarks.bench_cold_start [--workers 1] [--runs 3]
+"""
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import httpx
+
+from benchmarks.common import SEED_PASSWORD, create_schema, seed_database
+
+
+STARTUP_TIMEOUT = 60
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def measure(db_path: Path, username: str, workers: int, warm: bool, tmp: str) -> dict[str, float]:
+    port = free_port()
+    env = {**os.environ,
+           "DATABASE_URL": f"sqlite+aiosqlite:///{db_path}",
+           "LOG_PATH": str(Path(tmp) / "logs" / "app.log"),
+           "WARM_STARTUP": "1" if warm else "0"}
+    started = time.perf_counter()
+    process = subprocess.Popen([sys.executable, "-m", "src.server", "--workers", str(workers), "--port", str(port)],
+                               env=env)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=30) as client:
+            while True:
+                if time.perf_counter() - started > STARTUP_TIMEOUT or process.poll() is not None:
+                    raise RuntimeError("server did not start")
+                try:
+                    await client.get("/")
+                    break
+                except httpx.TransportError:
+                    await asyncio.sleep(0.005)
+            ready = time.perf_counter() - started
+
+            request_started = time.perf_counter()
+            response = await client.post("/auth/login", json={"username": username, "password": SEED_PASSWORD})
+            response.raise_for_status()
+            login = time.perf_counter() - request_started
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+            session_id = (await client.get("/chat/sessions", headers=headers)).json()["items"][0]["id"]
+            request_started = time.perf_counter()
+            response = await client.post("/chat/message", headers=headers, json={
+                "session_id": session_id, "sender_type": "user", "text": "Привет"})
+            response.raise_for_status()
+            message = time.perf_counter() - request_started
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+    return {"ready": ready, "login": login, "message": message}
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "cold.db"
+        await create_schema(db_path)
+        username = seed_database(db_path, users=1, sessions_per_user=1, messages_per_session=20)[0]
+
+        print(f"{'startup':>8} | {'ready, ms':>10} | {'1st login, ms':>14} | {'1st message, ms':>16}")
+        for warm in (False, True):
+            runs = [await measure(db_path, username, args.workers, warm, tmp) for _ in range(args.runs)]
+            best = {name: min(run[name] for run in runs) * 1000 for name in runs[0]}
+            print(f"{'warm' if warm else 'cold':>8} | {best['ready']:>10.0f} | {best['login']:>14.1f} | "
+                  f"{best['message']:>16.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--runs", type=int, default=3)
+    asyncio.run(main(parser.parse_args()))
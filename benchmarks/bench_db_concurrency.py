@@ -0,0 +1,68 @@
+"""Mixed read/write chat traffic against file SQLite, stock settings vs the production profile.
+
+Writers post messages while readers page through history at the same time.
+
+    python -m benchmarks.bench_db_concurrency [--writers 10] [--readers 20] [--seconds 5]
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.common import bench_client, percentiles, register_and_login
+
+
+async def run(profile: str, writers: int, readers: int, seconds: float) -> dict[str, dict[str, float]]:
+    async with bench_client(profile=profile) as client:
+        headers = await register_and_login(client, "bench_mixed")
+        session_ids = [(await client.post("/chat/session", headers=headers)).json()["id"] for _ in range(writers)]
+        for session_id in session_ids:
+            await client.post("/chat/message", headers=headers,
+                              json={"session_id": session_id, "sender_type": "user", "text": "привет"})
+
+        samples: dict[str, list[float]] = {"write": [], "read": []}
+        errors = 0
+        deadline = time.perf_counter() + seconds
+
+        async def loop(kind: str, session_id: str):
+            nonlocal errors
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                if kind == "write":
+                    response = await client.post("/chat/message", headers=headers,
+                                                 json={"session_id": session_id, "sender_type": "user", "text": "меню"})
+                else:
+                    response = await client.get(f"/chat/history/{session_id}", headers=headers)
+                if response.is_success:
+                    samples[kind].append(time.perf_counter() - started)
+                else:
+                    errors += 1
+
+        tasks = [loop("write", session_ids[i % writers]) for i in range(writers)]
+        tasks += [loop("read", session_ids[i % writers]) for i in range(readers)]
+        await asyncio.gather(*tasks)
+
+    result = {}
+    for kind, values in samples.items():
+        stats = {name: value * 1000 for name, value in percentiles(values).items()}
+        stats["rps"] = len(values) / seconds
+        result[kind] = stats
+    result["errors"] = {"count": errors}
+    return result
+
+
+async def main(args):
+    print(f"{'profile':>10} | {'kind':>5} | {'rps':>7} | {'p50, ms':>8} | {'p99, ms':>8}")
+    for profile in ("default", "production"):
+        result = await run(profile, args.writers, args.readers, args.seconds)
+        for kind in ("write", "read"):
+            stats = result[kind]
+            print(f"{profile:>10} | {kind:>5} | {stats['rps']:>7.1f} | {stats['p50']:>8.1f} | {stats['p99']:>8.1f}")
+        print(f"{profile:>10} | errors: {result['errors']['count']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--writers", type=int, default=10)
+    parser.add_argument("--readers", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=5)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,149 @@
+"""Memory and throughput of history export and import on a large seeded database.
+
+One user owns every message. Compared methods:
+  materialize   - load every Message through the ORM and build one JSON array (the old way to get everything)
+  history pages - walk /chat/history page by page for every session
+  export <fmt>  - stream /chat/export as ndjson, gzip or zstd
+  import        - POST the gzip export to /admin/import into an empty database
+
+Peak memory comes from a second pass under tracemalloc, so the timings are not skewed by it.
+
+    python -m benchmarks.bench_export [--messages 1000000] [--sessions 1000]
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from benchmarks.common import SEED_PASSWORD, bench_client, create_schema, seed_database
+from src.core import config
+from src.core.database import build_engine
+from src.models.session import Session
+from src.repositories import messages as messages_repo
+from src.services import export
+
+
+async def login(client) -> dict:
+    response = await client.post("/auth/login", json={"username": "seed_user0", "password": SEED_PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def materialize(db_path: Path, client) -> int:
+    engine = build_engine(f"sqlite+aiosqlite:///{db_path}", pool_size=1, read_only=True, echo=False)
+    session_maker = async_sessionmaker(bind=engine, expire_on_commit=False)
+    async with session_maker() as session:
+        session_ids = (await session.execute(select(Session.id).order_by(Session.created_date))).scalars().all()
+        items = []
+        for session_id in session_ids:
+            for message in await messages_repo.get_messages_by_session_id(session, session_id):
+                items.append({"sender_type": message.sender_type, "text": message.text,
+                              "sent_at": message.sent_at.isoformat()})
+        body = json.dumps(items, ensure_ascii=False).encode()
+    await engine.dispose()
+    return len(body)
+
+
+async def history_pages(db_path: Path, client) -> int:
+    headers = await login(client)
+    total = 0
+    cursor = None
+    while True:
+        params = {"limit": 100, **({"before": cursor} if cursor else {})}
+        page = (await client.get("/chat/sessions", headers=headers, params=params)).json()
+        for item in page["items"]:
+            before = None
+            while True:
+                params = {"limit": 200, **({"before": before} if before else {})}
+                response = await client.get(f"/chat/history/{item['id']}", headers=headers, params=params)
+                total += len(response.content)
+                before = response.json()["next_cursor"]
+                if not before:
+                    break
+        cursor = page["next_cursor"]
+        if not cursor:
+            return total
+
+
+def export_method(name: str, sink: list | None = None):
+    async def run(db_path: Path, client) -> int:
+        headers = await login(client)
+        total = 0
+        async with client.stream("GET", "/chat/export", headers=headers, params={"format": name}) as response:
+            async for chunk in response.aiter_raw():
+                total += len(chunk)
+                if sink is not None:
+                    sink.append(chunk)
+        return total
+    return run
+
+
+async def measure(method, db_path: Path, traced: bool) -> tuple[float, int, int]:
+    async with bench_client(db_path=db_path, live=True) as client:
+        if traced:
+            tracemalloc.start()
+        started = time.perf_counter()
+        size = await method(db_path, client)
+        elapsed = time.perf_counter() - started
+        peak = 0
+        if traced:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return elapsed, size, peak
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "export.db"
+        await create_schema(db_path)
+        started = time.perf_counter()
+        seed_database(db_path, users=1, sessions_per_user=args.sessions,
+                      messages_per_session=args.messages // args.sessions)
+        print(f"seeded {args.messages} messages in {args.sessions} sessions in {time.perf_counter() - started:.0f}s")
+
+        methods = {"materialize": materialize, "history pages": history_pages}
+        for name in export.FORMATS:
+            if name != "zstd" or export.zstandard is not None:
+                methods[f"export {name}"] = export_method(name)
+
+        print(f"{'method':>14} | {'seconds':>8} | {'msg/s':>9} | {'MB out':>8} | {'peak MB':>8}")
+        for name, method in methods.items():
+            elapsed, size, _ = await measure(method, db_path, traced=False)
+            _, _, peak = await measure(method, db_path, traced=True)
+            print(f"{name:>14} | {elapsed:>8.1f} | {args.messages / elapsed:>9.0f} | {size / 2**20:>8.1f} | "
+                  f"{peak / 2**20:>8.1f}")
+
+        chunks = []
+        await measure(export_method("gzip", chunks), db_path, traced=False)
+        body = b"".join(chunks)
+        config.ADMIN_USERNAMES = frozenset({"seed_user0"})
+        target = Path(tmp) / "import.db"
+        await create_schema(target)
+        seed_database(target, users=1, sessions_per_user=0, messages_per_session=0)
+        async with bench_client(db_path=target, live=True) as client:
+            headers = {**await login(client), "Content-Encoding": "gzip"}
+            started = time.perf_counter()
+            response = await client.post("/admin/import", headers=headers, content=iter_chunks(body))
+            elapsed = time.perf_counter() - started
+        print(f"{'import gzip':>14} | {elapsed:>8.1f} | {response.json()['imported'] / elapsed:>9.0f} | "
+              f"{len(body) / 2**20:>8.1f} |")
+        assert len(gzip.decompress(body).splitlines()) == args.messages
+
+
+async def iter_chunks(body: bytes, size: int = 64 * 1024):
+    for offset in range(0, len(body), size):
+        yield body[offset:offset + size]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--sessions", type=int, default=1000)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,64 @@
+"""Caller-side cost of the per-request INFO line in /chat/message.
+
+"before" is the original setup: synchronous loguru file sink and an
+eagerly built f-string with the full message text. "after" is the
+queued sink with lazy formatting, with and without sampling.
+
+    python -m benchmarks.bench_logging
+"""
+import tempfile
+import time
+from pathlib import Path
+
+from loguru import logger
+
+from src.core import logging as app_logging
+from src.core.logging import TEXT_FORMAT, QueuedFileSink, format_json, format_text, sampled
+
+
+CALLS = 20_000
+TEXT = "Здравствуйте! Подскажите, пожалуйста, есть ли доставка на улицу Донскую и сколько она стоит? " * 3
+USERNAME = "bench_user"
+
+
+def per_call_us(log_once) -> float:
+    started = time.perf_counter()
+    for _ in range(CALLS):
+        log_once()
+    return (time.perf_counter() - started) / CALLS * 1e6
+
+
+def log_before():
+    logger.info(f'Сообщение {TEXT} от {USERNAME} успешно обработано')
+
+
+def log_after():
+    sampled("chat.message").info('Сообщение "{text}" от {username} успешно обработано',
+                                 text=TEXT[:64], username=USERNAME)
+
+
+def main():
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        logger.remove()
+        logger.add(Path(tmp) / "before.log", level="INFO", format=TEXT_FORMAT, rotation="10 MB", compression="zip")
+        results["sync file sink, f-string (before)"] = per_call_us(log_before)
+
+        for name, formatter in (("text", format_text), ("json", format_json)):
+            logger.remove()
+            sink = QueuedFileSink(str(Path(tmp) / f"after-{name}.log"), formatter=formatter)
+            logger.add(sink, level="INFO", format="{message}")
+            app_logging.SAMPLE_RATES["chat.message"] = 1.0
+            results[f"queued {name}, lazy"] = per_call_us(log_after)
+            app_logging.SAMPLE_RATES["chat.message"] = 0.1
+            results[f"queued {name}, lazy, 10% sampled"] = per_call_us(log_after)
+            logger.remove()
+            sink.stop()
+
+    print(f"{'setup':>36} | per request, us")
+    for name, value in results.items():
+        print(f"{name:>36} | {value:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Chat read latency while a storm of logins hashes passwords.
+
+Compares the old behaviour (Argon2 inline on the event loop) with the
+bounded worker pool.
+
+    python -m benchmarks.bench_login_storm
+"""
+import asyncio
+import time
+
+from benchmarks.common import bench_client, percentiles, register_and_login
+from src.core.hashing import hashing_pool
+
+
+STORM_LOGINS = 40
+CHAT_REQUESTS = 60
+
+
+async def measure(kind: str) -> dict[str, float]:
+    hashing_pool.kind = kind
+    async with bench_client() as client:
+        headers = await register_and_login(client, "bench_reader")
+        await register_and_login(client, "bench_storm")
+        session_id = (await client.post("/chat/session", headers=headers)).json()["id"]
+
+        async def login():
+            await client.post("/auth/login", json={"username": "bench_storm", "password": "BenchPassword"})
+
+        async def read_history() -> float:
+            started = time.perf_counter()
+            await client.get(f"/chat/history/{session_id}", headers=headers)
+            return time.perf_counter() - started
+
+        async def chat_reader() -> list[float]:
+            samples = []
+            for _ in range(CHAT_REQUESTS):
+                samples.append(await read_history())
+                await asyncio.sleep(0.005)
+            return samples
+
+        storm = [asyncio.create_task(login()) for _ in range(STORM_LOGINS)]
+        samples = await chat_reader()
+        await asyncio.gather(*storm)
+    return {name: value * 1000 for name, value in percentiles(samples).items()}
+
+
+async def main():
+    print(f"{'hashing':>8} | {'p50, ms':>8} | {'p95, ms':>8} | {'p99, ms':>8}")
+    for kind in ("inline", "thread"):
+        result = await measure(kind)
+        print(f"{kind:>8} | {result['p50']:>8.1f} | {result['p95']:>8.1f} | {result['p99']:>8.1f}")
+    hashing_pool.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,84 @@
+"""Chat message throughput from many concurrent sessions: one commit per request vs the write-behind buffer.
+
+Every session posts its messages back to back; all sessions run at once.
+
+    python -m benchmarks.bench_message_writer [--sessions 1000] [--messages 5]
+"""
+import argparse
+import asyncio
+import tempfile
+import time
+
+from sqlalchemy import func, select
+
+from benchmarks.common import bench_client, percentiles, register_and_login
+from src.core.database import build_engine
+from src.models.message import Message
+
+
+MODES = {
+    "direct": None,
+    "batched/commit": {"wait_for_commit": True},
+    "batched/buffer": {"wait_for_commit": False},
+}
+
+
+async def count_rows(db_path) -> int:
+    engine = build_engine(f"sqlite+aiosqlite:///{db_path}", pool_size=1, echo=False)
+    async with engine.connect() as connection:
+        rows = (await connection.execute(select(func.count()).select_from(Message))).scalar_one()
+    await engine.dispose()
+    return rows
+
+
+async def run(mode: str, sessions: int, messages: int, tmp_dir: str) -> dict[str, float]:
+    db_path = f"{tmp_dir}/{mode.replace('/', '_')}.db"
+    async with bench_client(db_path=db_path, writer_options=MODES[mode]) as client:
+        headers = await register_and_login(client, "bench_writer")
+        session_ids = [(await client.post("/chat/session", headers=headers)).json()["id"] for _ in range(sessions)]
+
+        samples = []
+        errors = 0
+
+        async def chat(session_id: str):
+            nonlocal errors
+            for _ in range(messages):
+                started = time.perf_counter()
+                try:
+                    response = await client.post("/chat/message", headers=headers,
+                                                 json={"session_id": session_id, "sender_type": "user", "text": "меню"})
+                except Exception:
+                    # The in-process transport re-raises app errors such as "database is locked"
+                    errors += 1
+                    continue
+                if response.is_success:
+                    samples.append(time.perf_counter() - started)
+                else:
+                    errors += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(chat(session_id) for session_id in session_ids))
+        elapsed = time.perf_counter() - started
+
+    stats = {name: value * 1000 for name, value in percentiles(samples).items()}
+    stats["rps"] = len(samples) / elapsed
+    stats["errors"] = errors
+    # Two rows (user + bot) per request; the writer flushes everything on stop
+    stats["rows"] = await count_rows(db_path)
+    return stats
+
+
+async def main(args):
+    print(f"{'mode':>15} | {'msg/s':>7} | {'p50, ms':>8} | {'p99, ms':>8} | {'rows':>6} | errors")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for mode in MODES:
+            stats = await run(mode, args.sessions, args.messages, tmp_dir)
+            print(f"{mode:>15} | {stats['rps']:>7.1f} | {stats['p50']:>8.1f} | {stats['p99']:>8.1f} | "
+                  f"{stats['rows']:>6} | {stats['errors']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--messages", type=int, default=5)
+    asyncio.run(main(parser.parse_args()))
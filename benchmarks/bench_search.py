@@ -0,0 +1,113 @@
+"""Full-text search latency over a synthetic multi-million message corpus.
+
+Compares the FTS5 index behind /chat/search with what search would cost
+without it: loading the user's history session by session and scanning it in
+Python.
+
+    python -m benchmarks.bench_search [--messages 2000000] [--users 100] [--queries 50]
+"""
+import argparse
+import asyncio
+import random
+import sqlite3
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from benchmarks.common import WORDS, percentiles
+from src.core.database import build_engine
+from src.models import Base
+from src.models.session import Session
+from src.repositories import messages as messages_repo
+from src.services import search
+
+
+QUERIES = ("доставка", "заказать столик", "вегетарианский салат", "банкет терраса", "курьер адрес вечером")
+SESSIONS_PER_USER = 20
+BATCH = 50_000
+
+
+def build_corpus(path: Path, messages: int, users: int) -> float:
+    """Fill the database through the FTS triggers and return the insert time."""
+    rng = random.Random(42)
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    connection.executemany("INSERT INTO users (id, username, hashed_password) VALUES (?, ?, 'x')",
+                           [(user_id, f"user{user_id}") for user_id in range(1, users + 1)])
+    session_ids = [(str(uuid.uuid4()), user_id) for user_id in range(1, users + 1) for _ in range(SESSIONS_PER_USER)]
+    connection.executemany("INSERT INTO sessions (id, user_id) VALUES (?, ?)", session_ids)
+    connection.commit()
+
+    started = time.perf_counter()
+    for offset in range(0, messages, BATCH):
+        rows = []
+        for i in range(offset, min(offset + BATCH, messages)):
+            text = " ".join(rng.choices(WORDS, k=rng.randint(6, 16)))
+            sent_at = f"2026-01-01 00:00:00.{i % 1_000_000:06d}"
+            rows.append((rng.choice(session_ids)[0], "user" if i % 2 else "bot", text, sent_at))
+        connection.executemany("INSERT INTO messages (session_id, sender_type, text, sent_at) VALUES (?, ?, ?, ?)", rows)
+        connection.commit()
+    elapsed = time.perf_counter() - started
+    connection.close()
+    return elapsed
+
+
+async def scan_in_python(db_session, user_id: int, terms: list[str], limit: int) -> list:
+    stems = [search.stem(term) for term in terms]
+    session_ids = (await db_session.execute(select(Session.id).where(Session.user_id == user_id))).scalars().all()
+    hits = []
+    for session_id in session_ids:
+        for message in await messages_repo.get_messages_by_session_id(db_session, session_id):
+            words = message.text.lower().split()
+            if all(any(word.startswith(stem) for word in words) for stem in stems):
+                hits.append(message)
+    hits.sort(key=lambda m: (m.sent_at, m.id), reverse=True)
+    return hits[:limit]
+
+
+async def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "search.db"
+        engine = build_engine(f"sqlite+aiosqlite:///{path}", pool_size=1, echo=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        await engine.dispose()
+
+        insert_seconds = build_corpus(path, args.messages, args.users)
+        size_mb = sum(f.stat().st_size for f in Path(tmp).iterdir()) / 2**20
+        print(f"corpus: {args.messages} messages, {args.users} users, inserted in {insert_seconds:.1f}s "
+              f"({args.messages / insert_seconds:.0f} rows/s with FTS triggers), {size_mb:.0f} MB")
+
+        engine = build_engine(f"sqlite+aiosqlite:///{path}", pool_size=1, read_only=True, echo=False)
+        session_maker = async_sessionmaker(bind=engine, expire_on_commit=False)
+        rng = random.Random(7)
+        print(f"{'method':>10} | {'p50, ms':>8} | {'p95, ms':>8} | {'p99, ms':>8}")
+        for method in ("fts5", "scan"):
+            samples = []
+            queries = args.queries if method == "fts5" else max(1, args.queries // 10)
+            for _ in range(queries):
+                user_id = rng.randint(1, args.users)
+                terms = search.query_terms(rng.choice(QUERIES))
+                async with session_maker() as db_session:
+                    started = time.perf_counter()
+                    if method == "fts5":
+                        await messages_repo.search_messages(db_session, user_id, terms, limit=20)
+                    else:
+                        await scan_in_python(db_session, user_id, terms, limit=20)
+                    samples.append(time.perf_counter() - started)
+            stats = {name: value * 1000 for name, value in percentiles(samples).items()}
+            print(f"{method:>10} | {stats['p50']:>8.1f} | {stats['p95']:>8.1f} | {stats['p99']:>8.1f}")
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=2_000_000)
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--queries", type=int, default=50)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,116 @@
+"""Cost of building a /chat/history response for 10, 1k and 10k message histories.
+
+Compared paths:
+  orm + pydantic  - load Message objects, validate them into MessagePage and render with the stdlib
+                    (what FastAPI does for a response_model route with the default JSONResponse)
+  rows + stdlib   - load (id, sender_type, text, sent_at) rows and render plain dicts with json
+  rows + orjson   - the same rows rendered by orjson (the default when it is installed)
+
+Fetch and serialization are timed separately, per history, on a seeded SQLite file.
+
+    python -m benchmarks.bench_serialization [--sizes 10 1000 10000]
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from pydantic import TypeAdapter
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from benchmarks.common import create_schema, seed_database
+from src.core import responses
+from src.core.database import build_engine
+from src.models.message import Message, MessagePage
+from src.models.session import Session
+
+
+page_adapter = TypeAdapter(MessagePage)
+
+
+def render_pydantic(messages: list[Message]) -> bytes:
+    # FastAPI validates with from_attributes, dumps in JSON mode, then JSONResponse.render runs json.dumps
+    page = page_adapter.validate_python({"items": messages, "next_cursor": None}, from_attributes=True)
+    content = page_adapter.dump_python(page, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def row_items(rows) -> list[dict]:
+    return [{"sender_type": m.sender_type, "text": m.text, "sent_at": m.sent_at} for m in rows]
+
+
+def render_rows_stdlib(rows) -> bytes:
+    return responses.render_stdlib({"items": row_items(rows), "next_cursor": None})
+
+
+def render_rows_orjson(rows) -> bytes:
+    return responses.render_orjson({"items": row_items(rows), "next_cursor": None})
+
+
+async def timed(make, number: int) -> float:
+    started = time.perf_counter()
+    for _ in range(number):
+        await make()
+    return (time.perf_counter() - started) / number
+
+
+def timed_sync(render, data, number: int) -> float:
+    started = time.perf_counter()
+    for _ in range(number):
+        render(data)
+    return (time.perf_counter() - started) / number
+
+
+async def measure(size: int, tmp: str) -> list[tuple[str, float, float]]:
+    db_path = Path(tmp) / f"history-{size}.db"
+    await create_schema(db_path)
+    seed_database(db_path, users=1, sessions_per_user=1, messages_per_session=size)
+    engine = build_engine(f"sqlite+aiosqlite:///{db_path}", pool_size=1, read_only=True, echo=False)
+    session_maker = async_sessionmaker(bind=engine, expire_on_commit=False)
+    number = max(5, 20_000 // size)
+    results = []
+    async with session_maker() as session:
+        session_id = (await session.execute(select(Session.id))).scalar_one()
+        orm_statement = select(Message).where(Message.session_id == session_id).order_by(Message.sent_at, Message.id)
+        row_statement = (select(Message.id, Message.sender_type, Message.text, Message.sent_at)
+                         .where(Message.session_id == session_id).order_by(Message.sent_at, Message.id))
+
+        async def load_orm():
+            messages = (await session.execute(orm_statement)).scalars().all()
+            # Keep the identity map from turning later runs into cache hits
+            session.expunge_all()
+            return messages
+
+        async def load_rows():
+            return (await session.execute(row_statement)).all()
+
+        messages = await load_orm()
+        rows = await load_rows()
+        assert render_pydantic(messages) == render_rows_stdlib(rows)
+        orm_fetch = await timed(load_orm, number)
+        row_fetch = await timed(load_rows, number)
+        results.append(("orm + pydantic", orm_fetch, timed_sync(render_pydantic, messages, number)))
+        results.append(("rows + stdlib", row_fetch, timed_sync(render_rows_stdlib, rows, number)))
+        if responses.orjson is not None:
+            assert render_rows_orjson(rows) == render_rows_stdlib(rows)
+            results.append(("rows + orjson", row_fetch, timed_sync(render_rows_orjson, rows, number)))
+    await engine.dispose()
+    return results
+
+
+async def main(args):
+    print(f"{'messages':>8} | {'path':>14} | {'fetch, ms':>10} | {'serialize, ms':>14} | {'total, ms':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in args.sizes:
+            for name, fetch, serialize in await measure(size, tmp):
+                print(f"{size:>8} | {name:>14} | {fetch * 1e3:>10.3f} | {serialize * 1e3:>14.3f} | "
+                      f"{(fetch + serialize) * 1e3:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 10_000])
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,40 @@
+"""Time to first byte of a streamed answer versus the full JSON reply.
+
+    python -m benchmarks.bench_stream_ttfb
+"""
+import asyncio
+import time
+
+from benchmarks.common import bench_client, percentiles, register_and_login
+
+
+ROUNDS = 100
+
+
+async def main():
+    async with bench_client(live=True) as client:
+        headers = await register_and_login(client, "bench_stream")
+        session_id = (await client.post("/chat/session", headers=headers)).json()["id"]
+        body = {"session_id": session_id, "sender_type": "user", "text": "меню"}
+
+        ttfb, full = [], []
+        for _ in range(ROUNDS):
+            started = time.perf_counter()
+            async with client.stream("POST", "/chat/message/stream", headers=headers, json=body) as response:
+                chunks = response.aiter_bytes()
+                await anext(chunks)
+                ttfb.append(time.perf_counter() - started)
+                async for _ in chunks:
+                    pass
+
+            started = time.perf_counter()
+            (await client.post("/chat/message", headers=headers, json=body)).raise_for_status()
+            full.append(time.perf_counter() - started)
+
+    for name, samples in (("SSE first chunk", ttfb), ("JSON full reply", full)):
+        result = percentiles(samples)
+        print(f"{name:>16}: p50={result['p50'] * 1000:.2f}ms p95={result['p95'] * 1000:.2f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
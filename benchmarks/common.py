@@ -0,0 +1,174 @@
+import asyncio
+import random
+import socket
+import sqlite3
+import statistics
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import httpx
+import uvicorn
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from main import app
+from src.api.deps import get_message_writer, get_read_session, get_session, limit_auth, limit_chat
+from src.core import config
+from src.core.database import build_engine
+from src.core.logging import setup_logging, shutdown_logging
+from src.core.security import get_password_hash, token_cache
+from src.models import Base
+from src.repositories.users import user_cache
+from src.services.message_writer import MessageWriter
+
+
+WORDS = ("доставка доставку меню заказ заказать столик бронь ресторан ужин обед завтрак пицца паста салат суп "
+         "десерт вино кофе чай счет оплата карта наличные адрес время сегодня завтра вечером утром скидка "
+         "акция бонус отзыв жалоба спасибо привет пока помощь официант кухня повар курьер такси парковка "
+         "детский день рождения банкет зал терраса музыка вегетарианский острый горячий холодный").split()
+SEED_PASSWORD = "SeedPassword"
+
+
+async def create_schema(db_path: Path):
+    engine = build_engine(f"sqlite+aiosqlite:///{db_path}", pool_size=1, echo=False)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    await engine.dispose()
+
+
+def seed_database(db_path: Path, users: int, sessions_per_user: int, messages_per_session: int,
+                  seed: int = 42) -> list[str]:
+    """Fill an app schema with synthetic chats and return the seeded usernames.
+
+    Every user shares ``SEED_PASSWORD``; rows go in through plain sqlite3, so the
+    FTS triggers run but the app code does not, and session stats are written directly.
+    """
+    rng = random.Random(seed)
+    hashed_password = get_password_hash(SEED_PASSWORD)
+    usernames = [f"seed_user{i}" for i in range(users)]
+    started = datetime(2026, 1, 1)
+    connection = sqlite3.connect(db_path)
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    for username in usernames:
+        user_id = connection.execute("INSERT INTO users (username, hashed_password) VALUES (?, ?)",
+                                     (username, hashed_password)).lastrowid
+        for _ in range(sessions_per_user):
+            session_id = str(uuid.uuid4())
+            created = started + timedelta(seconds=rng.randint(0, 86400 * 30))
+            messages = []
+            for i in range(messages_per_session):
+                text = " ".join(rng.choices(WORDS, k=rng.randint(3, 16)))
+                messages.append((session_id, "user" if i % 2 == 0 else "bot", text, created + timedelta(seconds=i)))
+            last = messages[-1] if messages else None
+            connection.execute(
+                "INSERT INTO sessions (id, user_id, created_date, message_count, last_message_text, last_message_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (session_id, user_id, created.isoformat(" ", "microseconds"), len(messages),
+                 last[2][:120] if last else None, last[3].isoformat(" ", "microseconds") if last else None))
+            connection.executemany("INSERT INTO messages (session_id, sender_type, text, sent_at) VALUES (?, ?, ?, ?)",
+                                   [(sid, sender, text, sent.isoformat(" ", "microseconds"))
+                                    for sid, sender, text, sent in messages])
+        connection.commit()
+    connection.close()
+    return usernames
+
+
+@asynccontextmanager
+async def bench_client(db_path: Path | None = None, live: bool = False, profile: str = config.DATABASE_PROFILE,
+                       writer_options: dict | None = None):
+    """httpx client for the app backed by a throwaway file SQLite database.
+
+    By default requests go through the in-process ASGI transport, which buffers
+    whole responses; ``live=True`` serves the app with uvicorn on a local port
+    so streaming timings are real. ``writer_options`` switches message
+    persistence to a MessageWriter built with these arguments.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        # The app lifespan isn't run here, so logging goes to the file sink like in production,
+        # but into the throwaway directory rather than the repository's logs/
+        log_path = config.LOG_PATH
+        config.LOG_PATH = str(Path(tmp) / "logs" / "app.log")
+        setup_logging()
+        path = db_path or Path(tmp) / "bench.db"
+        url = f"sqlite+aiosqlite:///{path}"
+        engine = build_engine(url, pool_size=config.DB_WRITE_POOL_SIZE, profile=profile, echo=False)
+        read_engine = build_engine(url, pool_size=config.DB_READ_POOL_SIZE, read_only=True, profile=profile, echo=False)
+        session_maker = async_sessionmaker(bind=engine, expire_on_commit=False)
+        read_session_maker = async_sessionmaker(bind=read_engine, expire_on_commit=False)
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        async def override_get_session():
+            async with session_maker() as session:
+                yield session
+
+        async def override_get_read_session():
+            async with read_session_maker() as session:
+                yield session
+
+        app.dependency_overrides[get_session] = override_get_session
+        app.dependency_overrides[get_read_session] = override_get_read_session
+        # Benchmarks drive the app from one address far above the production limits
+        app.dependency_overrides[limit_auth] = lambda: None
+        app.dependency_overrides[limit_chat] = lambda: None
+        writer = None
+        if writer_options is not None:
+            writer = MessageWriter(session_maker, **writer_options)
+            writer.start()
+            app.dependency_overrides[get_message_writer] = lambda: writer
+        user_cache.clear()
+        token_cache.clear()
+        try:
+            if live:
+                async with serve(app) as base_url:
+                    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+                        yield client
+            else:
+                transport = httpx.ASGITransport(app=app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+                    yield client
+        finally:
+            if writer is not None:
+                await writer.stop()
+                app.dependency_overrides.pop(get_message_writer, None)
+            for dependency in (get_session, get_read_session, limit_auth, limit_chat):
+                app.dependency_overrides.pop(dependency, None)
+            await engine.dispose()
+            await read_engine.dispose()
+            shutdown_logging()
+            config.LOG_PATH = log_path
+
+
+@asynccontextmanager
+async def serve(asgi_app):
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    # No lifespan: it would warm up and then dispose the production engines, not the benchmark ones
+    server = uvicorn.Server(uvicorn.Config(asgi_app, host="127.0.0.1", port=port, lifespan="off", log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        await task
+
+
+async def register_and_login(client: httpx.AsyncClient, username: str, password: str = "BenchPassword") -> dict:
+    await client.post("/auth/register", json={"username": username, "password": password})
+    response = await client.post("/auth/login", json={"username": username, "password": password})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    if len(samples) < 2:
+        value = samples[0] if samples else 0.0
+        return {"p50": value, "p95": value, "p99": value}
+    cuts = statistics.quantiles(samples, n=100, method="inclusive")
+    return {"p50": cuts[49], "p95": cuts[94], "p99": cuts[98]}
@@ -0,0 +1,258 @@
+"""Reproducible load test of the chat API with per-route latency and throughput as JSON.
+
+Boots the app against a file SQLite seeded with synthetic users, sessions and
+messages, then drives a traffic mix at fixed concurrency for a fixed time.
+Every worker draws its requests from its own seeded RNG, so two runs with the
+same arguments send the same sequence of requests.
+
+    python -m benchmarks.load_test run [--scenario mixed] [--concurrency 20] [--duration 10]
+                                       [--output results.json] [--baseline old.json --threshold 0.15]
+    python -m benchmarks.load_test compare old.json new.json [--threshold 0.15]
+
+``run --baseline`` and ``compare`` exit with status 1 when a route got slower
+(p95) or lost throughput by more than the threshold, or started failing, so
+the command can gate a release.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+from benchmarks.common import SEED_PASSWORD, WORDS, bench_client, create_schema, percentiles, seed_database
+from src.core import config
+
+
+# Operation weights of each traffic mix
+SCENARIOS = {
+    "chat": {"message": 60, "history": 30, "sessions": 10},
+    "auth": {"login": 80, "register": 20},
+    "mixed": {"message": 45, "history": 30, "sessions": 15, "login": 7, "register": 3},
+}
+
+ROUTES = {
+    "message": "POST /chat/message",
+    "history": "GET /chat/history/{session_id}",
+    "sessions": "GET /chat/sessions",
+    "login": "POST /auth/login",
+    "register": "POST /auth/register",
+}
+
+# Absolute slack for the error-rate check in compare mode
+ERROR_RATE_TOLERANCE = 0.01
+
+
+class Worker:
+    def __init__(self, index: int, client: httpx.AsyncClient, username: str, weights: dict[str, int], seed: int):
+        self.index = index
+        self.client = client
+        self.username = username
+        self.rng = random.Random(seed * 1000 + index)
+        self.operations = list(weights)
+        self.weights = list(weights.values())
+        self.headers: dict[str, str] = {}
+        self.session_ids: list[str] = []
+        self.registered = 0
+
+    async def prepare(self):
+        response = await self.client.post("/auth/login", json={"username": self.username, "password": SEED_PASSWORD})
+        response.raise_for_status()
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        response = await self.client.get("/chat/sessions", headers=self.headers, params={"limit": 100})
+        self.session_ids = [item["id"] for item in response.json()["items"]]
+        if not self.session_ids:
+            # Seeded with --sessions 0: message and history requests need a session to target
+            response = await self.client.post("/chat/session", headers=self.headers)
+            response.raise_for_status()
+            self.session_ids = [response.json()["id"]]
+
+    def request(self, operation: str) -> tuple[str, str, dict]:
+        if operation == "message":
+            text = " ".join(self.rng.choices(WORDS, k=self.rng.randint(1, 8)))
+            return "POST", "/chat/message", {"headers": self.headers, "json": {
+                "session_id": self.rng.choice(self.session_ids), "sender_type": "user", "text": text}}
+        if operation == "history":
+            return "GET", f"/chat/history/{self.rng.choice(self.session_ids)}", {"headers": self.headers}
+        if operation == "sessions":
+            return "GET", "/chat/sessions", {"headers": self.headers}
+        if operation == "login":
+            return "POST", "/auth/login", {"json": {"username": self.username, "password": SEED_PASSWORD}}
+        self.registered += 1
+        return "POST", "/auth/register", {"json": {"username": f"load_{self.index}_{self.registered}",
+                                                   "password": SEED_PASSWORD}}
+
+    async def run(self, deadline: float, samples: dict[str, list[float]], errors: dict[str, int]):
+        while time.perf_counter() < deadline:
+            operation = self.rng.choices(self.operations, self.weights)[0]
+            method, url, kwargs = self.request(operation)
+            started = time.perf_counter()
+            try:
+                response = await self.client.request(method, url, **kwargs)
+                ok = response.is_success
+            except Exception:
+                ok = False
+            if ok:
+                samples[operation].append(time.perf_counter() - started)
+            else:
+                errors[operation] += 1
+
+
+def summarize(samples: list[float], errors: int, seconds: float) -> dict[str, float]:
+    stats = {name: round(value * 1000, 2) for name, value in percentiles(samples).items()}
+    total = len(samples) + errors
+    stats.update({"count": len(samples),
+                  "errors": errors,
+                  "error_rate": round(errors / total, 4) if total else 0.0,
+                  "rps": round(len(samples) / seconds, 2)})
+    return stats
+
+
+async def run_scenario(scenario: str, usernames: list[str], db_path: Path, args) -> dict:
+    weights = SCENARIOS[scenario]
+    async with bench_client(db_path=db_path, live=args.live) as client:
+        workers = [Worker(i, client, usernames[i % len(usernames)], weights, args.seed)
+                   for i in range(args.concurrency)]
+        for worker in workers:
+            await worker.prepare()
+
+        samples = {operation: [] for operation in weights}
+        errors = {operation: 0 for operation in weights}
+        started = time.perf_counter()
+        await asyncio.gather(*(worker.run(started + args.duration, samples, errors) for worker in workers))
+        elapsed = time.perf_counter() - started
+
+    routes = {ROUTES[operation]: summarize(samples[operation], errors[operation], elapsed) for operation in weights}
+    everything = [value for values in samples.values() for value in values]
+    return {"weights": weights,
+            "duration": round(elapsed, 2),
+            "routes": routes,
+            "total": summarize(everything, sum(errors.values()), elapsed)}
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: dict, current: dict, threshold: float) -> list[str]:
+    """Describe every route that regressed beyond ``threshold`` (a fraction) against the baseline."""
+    regressions = []
+    for scenario, result in current["scenarios"].items():
+        base_routes = baseline.get("scenarios", {}).get(scenario, {}).get("routes", {})
+        for route, stats in result["routes"].items():
+            base = base_routes.get(route)
+            if not base or not base["count"]:
+                continue
+            if stats["p95"] > base["p95"] * (1 + threshold):
+                regressions.append(f"{scenario} {route}: p95 {base['p95']} -> {stats['p95']} ms")
+            if stats["rps"] < base["rps"] * (1 - threshold):
+                regressions.append(f"{scenario} {route}: rps {base['rps']} -> {stats['rps']}")
+            if stats["error_rate"] > base["error_rate"] + ERROR_RATE_TOLERANCE:
+                regressions.append(f"{scenario} {route}: error rate {base['error_rate']} -> {stats['error_rate']}")
+    return regressions
+
+
+def print_table(results: dict):
+    print(f"{'scenario':>8} | {'route':>32} | {'rps':>8} | {'p50, ms':>8} | {'p95, ms':>8} | {'p99, ms':>8} | errors",
+          file=sys.stderr)
+    for scenario, result in results["scenarios"].items():
+        for route, stats in [*result["routes"].items(), ("total", result["total"])]:
+            print(f"{scenario:>8} | {route:>32} | {stats['rps']:>8.1f} | {stats['p50']:>8.1f} | "
+                  f"{stats['p95']:>8.1f} | {stats['p99']:>8.1f} | {stats['errors']}", file=sys.stderr)
+
+
+def report_regressions(regressions: list[str], threshold: float) -> int:
+    if regressions:
+        print(f"Regressions beyond {threshold:.0%}:", file=sys.stderr)
+        for regression in regressions:
+            print(f"  {regression}", file=sys.stderr)
+        return 1
+    print(f"No regressions beyond {threshold:.0%}", file=sys.stderr)
+    return 0
+
+
+async def run(args) -> int:
+    scenarios = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+    results = {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "database_profile": config.DATABASE_PROFILE,
+            "hash_pool": f"{config.HASH_POOL_KIND}x{config.HASH_POOL_WORKERS}",
+            "message_write_mode": config.MESSAGE_WRITE_MODE,
+            "transport": "uvicorn" if args.live else "asgi",
+            "args": {key: value for key, value in vars(args).items() if key not in ("command", "func")},
+        },
+        "scenarios": {},
+    }
+    for scenario in scenarios:
+        # A fresh seeded database per scenario keeps runs independent of each other
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = Path(tmp) / "load.db"
+            await create_schema(db_path)
+            usernames = seed_database(db_path, args.users, args.sessions, args.messages, seed=args.seed)
+            results["scenarios"][scenario] = await run_scenario(scenario, usernames, db_path, args)
+
+    output = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n", encoding="utf-8")
+    else:
+        print(output)
+    print_table(results)
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        return report_regressions(compare(baseline, results, args.threshold), args.threshold)
+    return 0
+
+
+def compare_files(args) -> int:
+    baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+    current = json.loads(Path(args.current).read_text(encoding="utf-8"))
+    return report_regressions(compare(baseline, current, args.threshold), args.threshold)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="seed a database, apply load and write the JSON report")
+    run_parser.add_argument("--scenario", choices=[*SCENARIOS, "all"], default="mixed")
+    run_parser.add_argument("--concurrency", type=int, default=20)
+    run_parser.add_argument("--duration", type=float, default=10, help="seconds of load per scenario")
+    run_parser.add_argument("--users", type=int, default=50)
+    run_parser.add_argument("--sessions", type=int, default=10, help="seeded sessions per user")
+    run_parser.add_argument("--messages", type=int, default=40, help="seeded messages per session")
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--live", action="store_true", help="serve with uvicorn instead of the in-process transport")
+    run_parser.add_argument("--output", help="write the JSON report here instead of stdout")
+    run_parser.add_argument("--baseline", help="JSON report to compare against")
+    run_parser.add_argument("--threshold", type=float, default=0.15)
+
+    compare_parser = commands.add_parser("compare", help="compare two JSON reports")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.15)
+
+    args = parser.parse_args()
+    if args.command == "run":
+        return asyncio.run(run(args))
+    return compare_files(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
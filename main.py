@@ -1,21 +1,85 @@
-from fastapi import FastAPI
-from fastapi.responses import RedirectResponse
+import asyncio
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
+from loguru import logger
+
+from src.api.routes import admin, auth, chat
+from src.core import config
+from src.core.database import AsyncSessionMaker, ReadSessionMaker, engine, read_engine
+from src.core.hashing import HashingPoolBusyError, hashing_pool
+from src.core.instrumentation import MetricsMiddleware, profiler
+from src.core.logging import setup_logging, shutdown_logging
+from src.core.metrics import render_metrics
+from src.core.responses import FastJSONResponse
+from src.core.rate_limit import RateLimitExceededError, retry_after_header
+from src.services.bot_engine import start_bot_engine, stop_bot_engine
+from src.services.knowledge import knowledge_base
+from src.services.message_writer import start_message_writer, stop_message_writer
+from src.services.retention import retention_loop
+from src.services.warmup import warm_up
+
 
-from src.api.routes import auth, chat
-from src.core.logging import setup_logging
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs before the server starts accepting connections and after it has drained them
+    setup_logging()
+    if config.WARM_STARTUP:
+        await warm_up(engine, read_engine, ReadSessionMaker)
+    start_bot_engine()
+    background_tasks = []
+    if config.MESSAGE_WRITE_MODE == "batched":
+        start_message_writer(AsyncSessionMaker)
+    if config.RETENTION_DAYS > 0 and config.SERVER_WORKER_INDEX == 0:
+        background_tasks.append(asyncio.create_task(retention_loop(engine, AsyncSessionMaker)))
+    if config.KNOWLEDGE_BASE_WATCH_INTERVAL > 0:
+        background_tasks.append(asyncio.create_task(knowledge_base.watch(config.KNOWLEDGE_BASE_WATCH_INTERVAL)))
+    yield
+    for task in background_tasks:
+        task.cancel()
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+    await stop_message_writer()
+    await stop_bot_engine()
+    profiler.stop()
+    hashing_pool.shutdown()
+    await engine.dispose()
+    await read_engine.dispose()
+    logger.info('Сервер остановлен')
+    shutdown_logging()
 
-app = FastAPI()
 
-setup_logging()
+app = FastAPI(lifespan=lifespan, default_response_class=FastJSONResponse)
+app.add_middleware(MetricsMiddleware)
 
 app.mount("/static", StaticFiles(directory="src/static"), name="static")
 
 
+@app.exception_handler(HashingPoolBusyError)
+async def hashing_pool_busy_handler(request: Request, exc: HashingPoolBusyError):
+    return FastJSONResponse(status_code=503,
+                            content={"detail": "Сервер перегружен, попробуйте позже"},
+                            headers={"Retry-After": "1"})
+
+
+@app.exception_handler(RateLimitExceededError)
+async def rate_limit_exceeded_handler(request: Request, exc: RateLimitExceededError):
+    return FastJSONResponse(status_code=429,
+                            content={"detail": "Слишком много запросов, попробуйте позже"},
+                            headers={"Retry-After": retry_after_header(exc.retry_after)})
+
+
 @app.get("/")
 async def index():
     return RedirectResponse("static/index.html")
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_metrics())
+
+
 app.include_router(auth.router)
 app.include_router(chat.router)
+app.include_router(admin.router)
@@ -1,16 +1,22 @@
-import jwt
 from jwt.exceptions import InvalidTokenError
-from fastapi import Depends, HTTPException
+from fastapi import Depends, HTTPException, Query, Request
 from fastapi.security import OAuth2PasswordBearer
+from loguru import logger
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Annotated
 from pydantic import ValidationError
 
-from src.core.security import SECRET_KEY, ALGORITHM
+from src.core import config
+from src.core.rate_limit import auth_concurrency, rate_limiter
+from src.core.security import decode_access_token
 from src.models.user import User
 from src.models.token import TokenData
-from src.core.database import AsyncSessionMaker
-from src.repositories.users import get_user_by_username
+from src.core.database import AsyncSessionMaker, ReadSessionMaker
+from src.repositories.users import get_cached_user_by_id, get_user_by_username
+import src.repositories.sessions as sessions_repo
+from src.services import bot_engine, export, message_writer
+from src.services.bot_engine import BotEngine
+from src.services.message_writer import MessageWriter
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
@@ -21,29 +27,119 @@ async def get_session():
         yield session
 
 
+async def get_read_session():
+    async with ReadSessionMaker() as session:
+        yield session
+
+
 SessionDep = Annotated[AsyncSession, Depends(get_session)]
+ReadSessionDep = Annotated[AsyncSession, Depends(get_read_session)]
+
+
+def get_message_writer() -> MessageWriter | None:
+    return message_writer.message_writer
+
+
+MessageWriterDep = Annotated[MessageWriter | None, Depends(get_message_writer)]
+
+
+def get_bot_engine() -> BotEngine:
+    return bot_engine.bot_engine
+
 
+BotEngineDep = Annotated[BotEngine, Depends(get_bot_engine)]
 
-async def get_current_user(db_session: SessionDep, token: str = Depends(oauth2_scheme)) -> User:
+
+async def get_user_from_token(db_session: AsyncSession, token: str) -> User:
     credentials_exception = HTTPException(status_code=401,
                                           detail="Не получилось проверить учетные данные",
                                           headers={"Authenticate": "Bearer"})
 
     try:
-        payload = jwt.decode(jwt=token,
-                             key=SECRET_KEY,
-                             algorithms=[ALGORITHM])
+        payload = decode_access_token(token)
         token_data = TokenData(**payload)
-        if not token_data.username:
+        if not token_data.username and token_data.user_id is None:
             raise credentials_exception
     except (InvalidTokenError, ValidationError):
         raise credentials_exception
 
-    user = await get_user_by_username(db_session, token_data.username)
+    if token_data.user_id is not None:
+        user = await get_cached_user_by_id(db_session, token_data.user_id)
+    else:
+        # Tokens issued before user_id was added to the payload
+        user = await get_user_by_username(db_session, token_data.username)
     if not user:
         raise HTTPException(status_code=404, detail="Пользователь не найден")
 
     return user
 
 
+async def get_current_user(db_session: ReadSessionDep, token: str = Depends(oauth2_scheme)) -> User:
+    return await get_user_from_token(db_session, token)
+
+
 CurrentUser = Annotated[User, Depends(get_current_user)]
+
+
+async def get_admin_user(current_user: CurrentUser) -> User:
+    if current_user.username not in config.ADMIN_USERNAMES:
+        raise HTTPException(status_code=403, detail="Доступ запрещен")
+    return current_user
+
+
+AdminUser = Annotated[User, Depends(get_admin_user)]
+
+
+async def authorize_session(db_session: AsyncSession, user: User, session_id: str) -> str:
+    owner_id = await sessions_repo.get_session_owner(db_session, session_id)
+    if owner_id is None:
+        logger.warning('{username} обратился к несуществующей сессии {session_id}',
+                       username=user.username, session_id=session_id)
+        raise HTTPException(status_code=404, detail="Сессия не найдена")
+    if owner_id != user.id:
+        logger.warning('{username} обратился к чужой сессии {session_id}',
+                       username=user.username, session_id=session_id)
+        raise HTTPException(status_code=403, detail="Доступ запрещен")
+    return session_id
+
+
+async def get_owned_session_id(current_user: CurrentUser, db_session: ReadSessionDep, session_id: str) -> str:
+    """The ``session_id`` path parameter, once the current user is known to own it."""
+    return await authorize_session(db_session, current_user, session_id)
+
+
+OwnedSessionId = Annotated[str, Depends(get_owned_session_id)]
+
+
+def get_export_format(export_format: Annotated[export.ExportFormat, Query(alias="format")] = "ndjson"
+                      ) -> export.ExportFormat:
+    try:
+        export.check_format(export_format)
+    except export.HistoryFormatError:
+        raise HTTPException(status_code=400, detail="Формат zstd недоступен на этом сервере")
+    return export_format
+
+
+ExportFormatDep = Annotated[export.ExportFormat, Depends(get_export_format)]
+
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+async def limit_auth(request: Request):
+    """Per-IP bucket plus a process-wide cap on auth requests running at once."""
+    await rate_limiter.hit("auth.ip", client_ip(request), config.RATE_LIMIT_AUTH_RATE, config.RATE_LIMIT_AUTH_BURST)
+    auth_concurrency.acquire()
+    try:
+        yield
+    finally:
+        auth_concurrency.release()
+
+
+async def limit_chat(current_user: CurrentUser):
+    await rate_limiter.hit("chat.user", str(current_user.id), config.RATE_LIMIT_CHAT_RATE, config.RATE_LIMIT_CHAT_BURST)
+
+
+AuthRateLimit = Depends(limit_auth)
+ChatRateLimit = Depends(limit_chat)
@@ -0,0 +1,62 @@
+from typing import Annotated
+from fastapi import APIRouter, Header, HTTPException, Request
+
+from src.api.deps import AdminUser, ExportFormatDep, MessageWriterDep, ReadSessionDep, SessionDep
+from src.core import config
+from src.services import export, knowledge
+from loguru import logger
+
+
+router = APIRouter(tags=["Admin"])
+
+
+@router.get("/admin/export")
+async def export_all_history(admin: AdminUser,
+                             session: ReadSessionDep,
+                             writer: MessageWriterDep,
+                             export_format: ExportFormatDep):
+    if writer is not None:
+        await writer.flush()
+    logger.info('{username} выгружает историю всех пользователей', username=admin.username)
+    return export.export_response(session, export_format, "history-all")
+
+
+@router.post("/admin/import")
+async def import_history(admin: AdminUser,
+                         session: SessionDep,
+                         request: Request,
+                         content_encoding: Annotated[str | None, Header()] = None):
+    try:
+        lines = export.iter_lines(request.stream(), content_encoding)
+        result = await export.import_history(session, lines)
+    except export.HistoryFormatError:
+        raise HTTPException(status_code=400, detail="Не удалось прочитать тело: ожидается NDJSON без сжатия, gzip или zstd "
+                                                    f"со строками не длиннее {config.IMPORT_MAX_LINE_BYTES} байт")
+    except export.HistoryImportError as exc:
+        logger.warning('Импорт истории прерван на строке {line}: {reason}', line=exc.line, reason=exc.reason)
+        raise HTTPException(status_code=400, detail={"line": exc.line, "error": exc.reason, "imported": exc.imported})
+    logger.info('{username} импортировал сообщений: {count}', username=admin.username, count=result["imported"])
+    return result
+
+
+def knowledge_base_info(snapshot) -> dict:
+    return {"version": snapshot.version,
+            "loaded_at": snapshot.loaded_at,
+            "intents": len(snapshot.matcher.intents),
+            "menu_items": len(snapshot.menu)}
+
+
+@router.get("/admin/knowledge-base")
+async def get_knowledge_base(admin: AdminUser):
+    return knowledge_base_info(knowledge.knowledge_base.current)
+
+
+@router.post("/admin/knowledge-base/reload")
+async def reload_knowledge_base(admin: AdminUser):
+    """Reload this worker now; the other workers pick the file up on their next check."""
+    try:
+        snapshot = await knowledge.knowledge_base.reload()
+    except knowledge.KnowledgeBaseError as exc:
+        logger.warning('{username} не смог обновить базу знаний: {error}', username=admin.username, error=str(exc))
+        raise HTTPException(status_code=400, detail=f"База знаний не загружена: {exc}")
+    return knowledge_base_info(snapshot)
@@ -1,7 +1,8 @@
 from datetime import timedelta
 from fastapi import APIRouter, HTTPException
 
-from src.api.deps import SessionDep
+from src.api.deps import AuthRateLimit, ReadSessionDep, SessionDep
+from src.core.logging import sampled
 from src.core.security import ACCESS_TOKEN_EXPIRE_MINUTES, create_access_token
 from src.models.token import Token
 from src.models.user import UserCreate
@@ -12,25 +13,25 @@ from loguru import logger
 router = APIRouter(tags=["Auth"])
 
 
-@router.post("/auth/register", status_code=201)
+@router.post("/auth/register", status_code=201, dependencies=[AuthRateLimit])
 async def register(session: SessionDep, user_create: UserCreate):
     user = await user_repo.get_user_by_username(session, user_create.username)
     if user:
-        logger.warning(f'Неудачная попытка регистрации {user_create.username}')
+        logger.warning('Неудачная попытка регистрации {username}', username=user_create.username)
         raise HTTPException(status_code=400, detail="Имя пользователя уже используется")
-    logger.info(f'Пользователь успешно зашел в систему {user_create.username}')
+    logger.info('Пользователь успешно зашел в систему {username}', username=user_create.username)
     await user_repo.create_user(session, user_create)
 
 
-@router.post("/auth/login", response_model=Token)
-async def login(session: SessionDep, user_login: UserCreate) -> Token:
+@router.post("/auth/login", response_model=Token, dependencies=[AuthRateLimit])
+async def login(session: ReadSessionDep, user_login: UserCreate) -> Token:
     user = await user_repo.authenticate(session, user_login.username, user_login.password)
     if not user:
-        logger.warning(f'Неудачная попытка входа {user_login.username}')
+        logger.warning('Неудачная попытка входа {username}', username=user_login.username)
         raise HTTPException(status_code=401, detail="Неверное имя или пароль")
     access_token = create_access_token(
-        data={"username": user.username},
+        data={"username": user.username, "user_id": user.id},
         expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     )
-    logger.info(f'Пользователь успешно вошел в систему {user.username}')
+    sampled("auth.login").info('Пользователь успешно вошел в систему {username}', username=user.username)
     return Token(access_token=access_token)
@@ -1,69 +1,344 @@
-import asyncio
-from fastapi import APIRouter, HTTPException
+import json
+from typing import Annotated, AsyncIterator
+from fastapi import APIRouter, Header, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import Row
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.api.deps import CurrentUser, SessionDep
-from src.models.message import MessageCreate, MessageOut
+from src.api.deps import (BotEngineDep, ChatRateLimit, CurrentUser, ExportFormatDep, MessageWriterDep, OwnedSessionId,
+                          ReadSessionDep, SessionDep, authorize_session, get_user_from_token)
+from src.core import config
+from src.core.logging import sampled
+from src.core.pagination import InvalidCursorError, encode_cursor, decode_cursor
+from src.core.rate_limit import RateLimitExceededError, rate_limiter
+from src.core.responses import FastJSONResponse
+from src.models.message import CLIENT_MESSAGE_ID_MAX_LENGTH, Message, MessageCreate, MessagePage, MessageSearchPage
+from src.models.session import SessionBulkDelete, SessionPage
+from src.models.user import User
 import src.repositories.sessions as sessions_repo
 import src.repositories.messages as messages_repo
-from src.services import bot
+from src.services import bot, export, idempotency, search
+from src.services.bot_engine import BotEngine
+from src.services.message_writer import MessageWriter
 from loguru import logger
 
 router = APIRouter(tags=["Chat"])
 
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+SESSIONS_PAGE_SIZE = 20
+SESSIONS_MAX_PAGE_SIZE = 100
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 100
 
-@router.post("/chat/session")
+
+async def persist_messages(session: AsyncSession, writer: MessageWriter | None, *messages: MessageCreate):
+    try:
+        if writer is not None:
+            # Release the pooled connection first; the writer needs one to flush the batch
+            await session.commit()
+            await writer.submit(*messages)
+        elif len(messages) == 1:
+            await messages_repo.save_message(session, messages[0])
+        else:
+            await messages_repo.save_exchange(session, *messages)
+    except (IntegrityError, sessions_repo.SessionNotFoundError):
+        # The cached owner let the message through, but the session may have been deleted since
+        session_id = messages[0].session_id
+        await session.rollback()
+        sessions_repo.session_owner_cache.invalidate(session_id)
+        if await sessions_repo.get_session_owner(session, session_id) is None:
+            raise HTTPException(status_code=404, detail="Сессия не найдена")
+        raise
+
+
+def merge_pending(messages: list[Row], has_more: bool, pending: list[Message],
+                  limit: int, forward: bool) -> tuple[list[Row | Message], bool]:
+    """Add buffered messages to a history page, skipping any that were committed meanwhile."""
+    committed = {(m.sent_at, m.sender_type, m.text) for m in messages}
+    merged = messages + [m for m in pending if (m.sent_at, m.sender_type, m.text) not in committed]
+    merged.sort(key=lambda m: m.sent_at)
+    if len(merged) > limit:
+        has_more = True
+        merged = merged[:limit] if forward else merged[-limit:]
+    return merged, has_more
+
+
+@router.post("/chat/session", dependencies=[ChatRateLimit])
 async def create_chat_session(current_user: CurrentUser, db_session: SessionDep):
     session = await sessions_repo.create_session(db_session, current_user.id)
-    logger.info(f'Сессия пользователя {current_user.username} успешно создана')
+    sampled("chat.session").info('Сессия пользователя {username} успешно создана', username=current_user.username)
     return session
 
 
-@router.post("/chat/message", status_code=201)
-async def handle_message(current_user: CurrentUser, session: SessionDep, message_create: MessageCreate):
-    check_session = await sessions_repo.get_session(session, message_create.session_id)
-    if not check_session:
-        logger.warning(f'{current_user.username} попытался отправить сообщение в несуществующую сессию')
-        raise HTTPException(status_code=404, detail="Сессия не найдена")
-    if check_session.user_id != current_user.id:
-        logger.warning(f'{current_user.username} попытался сообщение в чужую сессию')
-        raise HTTPException(status_code=403, detail="Доступ запрещен")
+@router.get("/chat/sessions", response_model=SessionPage)
+async def list_chat_sessions(current_user: CurrentUser,
+                             session: ReadSessionDep,
+                             limit: Annotated[int, Query(ge=1, le=SESSIONS_MAX_PAGE_SIZE)] = SESSIONS_PAGE_SIZE,
+                             before: str | None = None):
+    try:
+        before_key = decode_cursor(before) if before else None
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+
+    sessions, has_more = await sessions_repo.get_user_sessions_page(session, current_user.id, limit, before=before_key)
+    next_cursor = encode_cursor(sessions[-1].created_date, sessions[-1].id) if has_more else None
+    return {"items": sessions, "next_cursor": next_cursor}
+
+
+async def submit_message(current_user: User, session: AsyncSession, writer: MessageWriter | None, engine: BotEngine,
+                         message_create: MessageCreate) -> dict | None:
+    await authorize_session(session, current_user, message_create.session_id)
+
+    client_message_id = message_create.client_message_id
+    if client_message_id is not None:
+        # Retried after the cached response expired, or first sent to another worker
+        stored = await messages_repo.get_reply_by_client_message_id(session, message_create.session_id,
+                                                                    client_message_id)
+        if stored is not None:
+            idempotency.REPLAYS.inc(source="database")
+            return message_response(stored[1])
+        # The unique index has to judge a concurrent duplicate in this request's own transaction
+        writer = None
 
-    await messages_repo.save_message(session, message_create)
     if message_create.sender_type == "bot":
+        reply = None
+        messages = (message_create,)
+    else:
+        # Don't hold a pooled connection while a backend engine thinks
+        await session.commit()
+        reply = await engine.answer(message_create.text)
+        messages = (message_create,
+                    MessageCreate(session_id=message_create.session_id, sender_type="bot", text=reply.text,
+                                  client_message_id=client_message_id))
+    try:
+        await persist_messages(session, writer, *messages)
+    except IntegrityError:
+        if client_message_id is None:
+            raise
+        # Another worker stored the same submission first
+        await session.rollback()
+        stored = await messages_repo.get_reply_by_client_message_id(session, message_create.session_id,
+                                                                    client_message_id)
+        if stored is None:
+            raise
+        idempotency.REPLAYS.inc(source="database")
+        return message_response(stored[1])
+
+    if reply is None:
+        return None
+    sampled("chat.message").info('Сообщение "{text}" от {username} успешно обработано ({engine}, база знаний {version})',
+                                 text=message_create.text[:64], username=current_user.username,
+                                 engine=reply.engine, version=reply.kb_version)
+    return { "answer": reply.text, "typing_delay_ms": config.BOT_TYPING_DELAY_MS, "kb_version": reply.kb_version }
+
+
+def message_response(bot_message: Message | None) -> dict | None:
+    if bot_message is None:
         return None
+    # The knowledge base version isn't stored with the message
+    return { "answer": bot_message.text, "typing_delay_ms": config.BOT_TYPING_DELAY_MS, "kb_version": None }
+
+
+@router.post("/chat/message", status_code=201, dependencies=[ChatRateLimit])
+async def handle_message(current_user: CurrentUser, session: SessionDep, writer: MessageWriterDep,
+                         engine: BotEngineDep, message_create: MessageCreate,
+                         idempotency_key: Annotated[str | None, Header(min_length=1,
+                                                                       max_length=CLIENT_MESSAGE_ID_MAX_LENGTH)] = None):
+    if idempotency_key is not None:
+        if message_create.client_message_id not in (None, idempotency_key):
+            raise HTTPException(status_code=400, detail="Idempotency-Key не совпадает с client_message_id")
+        message_create.client_message_id = idempotency_key
+    if message_create.client_message_id is None:
+        return await submit_message(current_user, session, writer, engine, message_create)
+
+    # Duplicates are answered from memory before the session check, the bot or any write
+    key = (current_user.id, message_create.session_id, message_create.client_message_id)
+    return await idempotency.run_once(key, lambda: submit_message(current_user, session, writer, engine,
+                                                                  message_create))
+
 
-    bot_answer = bot.get_bot_answer(message_create.text)
-    bot_message_create = MessageCreate(session_id=message_create.session_id, sender_type="bot", text=bot_answer)
-    await messages_repo.save_message(session, bot_message_create)
-    logger.info(f'Сообщение {message_create.text} от {current_user.username} успешно обработано')
-    await asyncio.sleep(1.5)
-    return { "answer": bot_answer }
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
 
 
-@router.get("/chat/history/{session_id}", response_model=list[MessageOut])
-async def get_messages_history(current_user: CurrentUser, session: SessionDep, session_id: str):
-    check_session = await sessions_repo.get_session(session, session_id)
-    if not check_session:
-        logger.warning(f'{current_user.username} попытался получить сообщения из несуществующей сессии')
-        raise HTTPException(status_code=404, detail="Сессия не найдена")
-    if check_session.user_id != current_user.id:
-        logger.warning(f'{current_user.username} попытался получить сообщения из чужой сессии')
-        raise HTTPException(status_code=403, detail="Доступ запрещен")
+@router.post("/chat/message/stream", dependencies=[ChatRateLimit])
+async def handle_message_stream(current_user: CurrentUser, session: SessionDep, writer: MessageWriterDep,
+                                engine: BotEngineDep, message_create: MessageCreate):
+    if message_create.sender_type != "user":
+        raise HTTPException(status_code=400, detail="Потоковый ответ доступен только для сообщений пользователя")
+    # A streamed reply can't be replayed, so retries of it aren't deduplicated
+    message_create.client_message_id = None
+    await authorize_session(session, current_user, message_create.session_id)
 
-    messages = await messages_repo.get_messages_by_session_id(session, session_id)
-    logger.info(f'Доступ к сессии {session_id} успешно получен')
-    return messages
+    async def events() -> AsyncIterator[str]:
+        await session.commit()
+        reply = await engine.answer(message_create.text)
+        for chunk in bot.split_answer(reply.text):
+            yield sse_event("chunk", {"text": chunk})
+        bot_message_create = MessageCreate(session_id=message_create.session_id, sender_type="bot", text=reply.text)
+        try:
+            await persist_messages(session, writer, message_create, bot_message_create)
+        except HTTPException as exc:
+            # The chunks are already out; the client learns from the last event that nothing was saved
+            yield sse_event("error", {"detail": exc.detail})
+            return
+        sampled("chat.message").info('Сообщение "{text}" от {username} успешно обработано ({engine}, база знаний {version})',
+                                     text=message_create.text[:64], username=current_user.username,
+                                     engine=reply.engine, version=reply.kb_version)
+        yield sse_event("done", {"answer": reply.text, "kb_version": reply.kb_version})
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@router.websocket("/chat/ws/{session_id}")
+async def chat_websocket(websocket: WebSocket, session: SessionDep, writer: MessageWriterDep, engine: BotEngineDep,
+                         session_id: str, token: str = ""):
+    try:
+        current_user = await get_user_from_token(session, token)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    if await sessions_repo.get_session_owner(session, session_id) != current_user.id:
+        logger.warning('{username} попытался подключиться к чужой или несуществующей сессии', username=current_user.username)
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    # End the read transaction so an idle socket doesn't pin a pooled connection
+    await session.commit()
+
+    await websocket.accept()
+    logger.info('{username} подключился к сессии {session_id} по WebSocket',
+                username=current_user.username, session_id=session_id)
+    try:
+        while True:
+            raw_message = await websocket.receive_text()
+            try:
+                payload = json.loads(raw_message)
+                message_create = MessageCreate(session_id=session_id, sender_type="user", text=payload.get("text"))
+            except (ValueError, ValidationError, AttributeError):
+                await websocket.send_json({"type": "error", "detail": "Некорректное сообщение"})
+                continue
+            try:
+                await rate_limiter.hit("chat.user", str(current_user.id),
+                                       config.RATE_LIMIT_CHAT_RATE, config.RATE_LIMIT_CHAT_BURST)
+            except RateLimitExceededError as exc:
+                await websocket.send_json({"type": "error", "detail": "Слишком много сообщений",
+                                           "retry_after": exc.retry_after})
+                continue
+
+            reply = await engine.answer(message_create.text)
+            for chunk in bot.split_answer(reply.text):
+                await websocket.send_json({"type": "chunk", "text": chunk})
+            bot_message_create = MessageCreate(session_id=session_id, sender_type="bot", text=reply.text)
+            try:
+                await persist_messages(session, writer, message_create, bot_message_create)
+            except HTTPException as exc:
+                await websocket.send_json({"type": "error", "detail": exc.detail})
+                await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+                return
+            await websocket.send_json({"type": "done", "answer": reply.text, "kb_version": reply.kb_version})
+    except WebSocketDisconnect:
+        logger.info('{username} отключился от сессии {session_id}',
+                    username=current_user.username, session_id=session_id)
+
+
+@router.get("/chat/history/{session_id}", response_model=MessagePage)
+async def get_messages_history(session: ReadSessionDep,
+                               writer: MessageWriterDep,
+                               session_id: OwnedSessionId,
+                               limit: Annotated[int, Query(ge=1, le=HISTORY_MAX_PAGE_SIZE)] = HISTORY_PAGE_SIZE,
+                               before: str | None = None,
+                               after: str | None = None):
+    if before and after:
+        raise HTTPException(status_code=400, detail="Нельзя указывать before и after одновременно")
+    try:
+        before_key = decode_cursor(before) if before else None
+        after_key = decode_cursor(after) if after else None
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+
+    # Buffered messages are always newer than anything a "before" cursor points at
+    pending = writer.pending(session_id) if writer is not None and before_key is None else []
+    if after_key is not None:
+        pending = [m for m in pending if m.sent_at > after_key[0]]
+    messages, has_more = await messages_repo.get_messages_page(session, session_id, limit,
+                                                               before=before_key, after=after_key)
+    if pending:
+        messages, has_more = merge_pending(messages, has_more, pending, limit, forward=after_key is not None)
+        if has_more and (messages[-1] if after_key else messages[0]).id is None:
+            # The cursor edge has no id yet: commit the buffer and read the page again
+            await writer.flush()
+            await session.commit()
+            messages, has_more = await messages_repo.get_messages_page(session, session_id, limit,
+                                                                       before=before_key, after=after_key)
+    next_cursor = None
+    if has_more:
+        edge = messages[-1] if after_key else messages[0]
+        next_cursor = encode_cursor(edge.sent_at, edge.id)
+    sampled("chat.history").info('Доступ к сессии {session_id} успешно получен', session_id=session_id)
+    # Rows are already in MessageOut's shape, so skip response_model validation
+    items = [{"sender_type": m.sender_type, "text": m.text, "sent_at": m.sent_at} for m in messages]
+    return FastJSONResponse({"items": items, "next_cursor": next_cursor})
+
+
+@router.get("/chat/export", dependencies=[ChatRateLimit])
+async def export_user_history(current_user: CurrentUser,
+                              session: ReadSessionDep,
+                              writer: MessageWriterDep,
+                              export_format: ExportFormatDep):
+    if writer is not None:
+        await writer.flush()
+    logger.info('{username} выгружает историю всех сессий', username=current_user.username)
+    return export.export_response(session, export_format, f"history-{current_user.id}", user_id=current_user.id)
+
+
+@router.get("/chat/export/{session_id}", dependencies=[ChatRateLimit])
+async def export_session_history(session: ReadSessionDep,
+                                 writer: MessageWriterDep,
+                                 session_id: OwnedSessionId,
+                                 export_format: ExportFormatDep):
+    if writer is not None:
+        await writer.flush()
+    return export.export_response(session, export_format, f"session-{session_id}", session_id=session_id)
+
+
+@router.get("/chat/search", response_model=MessageSearchPage, dependencies=[ChatRateLimit])
+async def search_chat_messages(current_user: CurrentUser,
+                               session: ReadSessionDep,
+                               q: Annotated[str, Query(min_length=1, max_length=200)],
+                               limit: Annotated[int, Query(ge=1, le=SEARCH_MAX_PAGE_SIZE)] = SEARCH_PAGE_SIZE,
+                               before: str | None = None):
+    terms = search.query_terms(q)
+    if not terms:
+        raise HTTPException(status_code=400, detail="Пустой поисковый запрос")
+    try:
+        before_key = decode_cursor(before) if before else None
+    except InvalidCursorError:
+        raise HTTPException(status_code=400, detail="Некорректный курсор")
+
+    rows, has_more = await messages_repo.search_messages(session, current_user.id, terms, limit, before=before_key)
+    items = [{**row._mapping, "snippet": search.render_snippet(row.snippet)} for row in rows]
+    next_cursor = encode_cursor(rows[-1].sent_at, rows[-1].id) if has_more else None
+    sampled("chat.search").info('{username} выполнил поиск по истории', username=current_user.username)
+    return {"items": items, "next_cursor": next_cursor}
 
 
 @router.delete("/chat/history/{session_id}")
-async def delete_messages_history(current_user: CurrentUser, session: SessionDep, session_id: str):
-    check_session = await sessions_repo.get_session(session, session_id)
-    if not check_session:
-        logger.warning(f'{current_user.username} попытался удалить несуществующую сессию')
-        raise HTTPException(status_code=404, detail="Сессия не найдена")
-    if check_session.user_id != current_user.id:
-        logger.warning(f'{current_user.username} попытался удалить чужую сессию')
-        raise HTTPException(status_code=403, detail="Доступ запрещен")
-
-    logger.info(f'Сессия {session_id} успешно удалена')
-    await messages_repo.delete_messages_by_session_id(session, session_id)
+async def delete_messages_history(session: SessionDep, writer: MessageWriterDep, session_id: OwnedSessionId):
+    if writer is not None:
+        await writer.flush()
+    await sessions_repo.delete_session(session, session_id)
+    logger.info('Сессия {session_id} успешно удалена', session_id=session_id)
+
+
+@router.post("/chat/sessions/delete")
+async def delete_sessions(current_user: CurrentUser, session: SessionDep, writer: MessageWriterDep,
+                          bulk_delete: SessionBulkDelete):
+    if writer is not None:
+        await writer.flush()
+    deleted_ids = await sessions_repo.delete_user_sessions(session, current_user.id, bulk_delete.session_ids)
+    logger.info('Пользователь {username} удалил сессий: {count}', username=current_user.username, count=len(deleted_ids))
+    return {"deleted": deleted_ids}
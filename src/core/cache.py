@@ -0,0 +1,58 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from src.core.metrics import Counter
+
+
+CACHE_HITS = Counter("cache_hits_total", "In-process cache hits", labelnames=("cache",))
+CACHE_MISSES = Counter("cache_misses_total", "In-process cache misses", labelnames=("cache",))
+CACHE_EVICTIONS = Counter("cache_evictions_total", "Entries evicted by size or TTL", labelnames=("cache",))
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after ``ttl`` seconds."""
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            CACHE_MISSES.inc(cache=self.name)
+            return default
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            CACHE_EVICTIONS.inc(cache=self.name)
+            CACHE_MISSES.inc(cache=self.name)
+            return default
+        self._data.move_to_end(key)
+        CACHE_HITS.inc(cache=self.name)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            CACHE_EVICTIONS.inc(cache=self.name)
+
+    def invalidate(self, key: Hashable):
+        self._data.pop(key, None)
+
+    def clear(self):
+        self._data.clear()
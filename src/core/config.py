@@ -0,0 +1,151 @@
+import os
+
+
+def env_str(name: str, default: str) -> str:
+    return os.getenv(name, default)
+
+
+def env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+def env_float(name: str, default: float) -> float:
+    return float(os.getenv(name, default))
+
+
+def env_positive_float(name: str, default: float) -> float:
+    value = env_float(name, default)
+    if value <= 0:
+        raise ValueError(f"{name} must be greater than 0, got {value}")
+    return value
+
+
+def env_float_at_least(name: str, default: float, minimum: float) -> float:
+    value = env_float(name, default)
+    if value < minimum:
+        raise ValueError(f"{name} must be at least {minimum}, got {value}")
+    return value
+
+
+def env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Password hashing pool: thread | process | inline (runs on the event loop)
+HASH_POOL_KIND = env_str("HASH_POOL_KIND", "thread")
+HASH_POOL_WORKERS = env_int("HASH_POOL_WORKERS", min(4, os.cpu_count() or 1))
+HASH_POOL_MAX_PENDING = env_int("HASH_POOL_MAX_PENDING", 32)
+
+# In-process caches; a size of 0 disables the cache
+USER_CACHE_SIZE = env_int("USER_CACHE_SIZE", 1024)
+USER_CACHE_TTL = env_float("USER_CACHE_TTL", 60)
+TOKEN_CACHE_SIZE = env_int("TOKEN_CACHE_SIZE", 4096)
+TOKEN_CACHE_TTL = env_float("TOKEN_CACHE_TTL", 300)
+# Owner of each chat session; only deletes change it, and those invalidate the entry on this worker
+SESSION_OWNER_CACHE_SIZE = env_int("SESSION_OWNER_CACHE_SIZE", 10000)
+SESSION_OWNER_CACHE_TTL = env_float("SESSION_OWNER_CACHE_TTL", 300)
+# Responses to recent idempotent /chat/message submissions
+IDEMPOTENCY_CACHE_SIZE = env_int("IDEMPOTENCY_CACHE_SIZE", 10000)
+IDEMPOTENCY_CACHE_TTL = env_float("IDEMPOTENCY_CACHE_TTL", 600)
+
+# JSON renderer for API responses: orjson (falls back to stdlib with a warning if missing) or stdlib
+JSON_RENDERER = env_str("JSON_RENDERER", "orjson")
+
+# How long the web client keeps the "typing" indicator before showing a reply
+BOT_TYPING_DELAY_MS = env_int("BOT_TYPING_DELAY_MS", 1500)
+
+# Bot knowledge base (intents, answers, menu): JSON file, src/services/knowledge_base.json
+# if empty. Every worker checks the file this often and reloads it on change (0 disables).
+KNOWLEDGE_BASE_PATH = env_str("KNOWLEDGE_BASE_PATH", "")
+KNOWLEDGE_BASE_WATCH_INTERVAL = env_float("KNOWLEDGE_BASE_WATCH_INTERVAL", 5)
+
+# Who writes bot replies: rules (knowledge base intents) or http (a backend at BOT_BACKEND_URL,
+# with the rules as fallback). The timeout covers the whole call, queueing for a slot included.
+BOT_ENGINE = env_str("BOT_ENGINE", "rules")
+BOT_BACKEND_URL = env_str("BOT_BACKEND_URL", "")
+BOT_BACKEND_TIMEOUT = env_float("BOT_BACKEND_TIMEOUT", 2.0)
+BOT_BACKEND_MAX_CONCURRENCY = env_int("BOT_BACKEND_MAX_CONCURRENCY", 32)
+
+# Database. DATABASE_PROFILE=production applies the SQLite tuning pragmas,
+# DATABASE_PROFILE=default leaves SQLite with its stock settings.
+DATABASE_URL = env_str("DATABASE_URL", "sqlite+aiosqlite:///chatbot.db")
+DATABASE_READ_URL = env_str("DATABASE_READ_URL", DATABASE_URL)
+DATABASE_ECHO = env_bool("DATABASE_ECHO", False)
+DATABASE_PROFILE = env_str("DATABASE_PROFILE", "production")
+DB_WRITE_POOL_SIZE = env_int("DB_WRITE_POOL_SIZE", 5)
+DB_READ_POOL_SIZE = env_int("DB_READ_POOL_SIZE", 10)
+DB_MAX_OVERFLOW = env_int("DB_MAX_OVERFLOW", 10)
+DB_POOL_TIMEOUT = env_float("DB_POOL_TIMEOUT", 30)
+DB_POOL_RECYCLE = env_int("DB_POOL_RECYCLE", 1800)
+DB_POOL_PRE_PING = env_bool("DB_POOL_PRE_PING", True)
+# asyncpg prepared statement caches; set both to 0 behind pgbouncer in transaction mode
+PG_STATEMENT_CACHE_SIZE = env_int("PG_STATEMENT_CACHE_SIZE", 100)
+PG_PREPARED_STATEMENT_CACHE_SIZE = env_int("PG_PREPARED_STATEMENT_CACHE_SIZE", 100)
+SQLITE_BUSY_TIMEOUT_MS = env_int("SQLITE_BUSY_TIMEOUT_MS", 5000)
+SQLITE_MMAP_SIZE = env_int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)
+SQLITE_CACHE_SIZE_KB = env_int("SQLITE_CACHE_SIZE_KB", 64 * 1024)
+
+# Logging. LOG_FORMAT is text or json; LOG_SAMPLE_RATES keeps a fraction of
+# high-volume INFO lines per route, e.g. "chat.message=0.1,chat.history=0.1";
+# LOG_QUEUE_SIZE bounds the records waiting for the file writer, the rest are dropped
+LOG_PATH = env_str("LOG_PATH", "logs/app.log")
+LOG_LEVEL = env_str("LOG_LEVEL", "INFO")
+LOG_FORMAT = env_str("LOG_FORMAT", "text")
+LOG_ENQUEUE = env_bool("LOG_ENQUEUE", True)
+LOG_QUEUE_SIZE = env_int("LOG_QUEUE_SIZE", 10000)
+LOG_SAMPLE_RATES = env_str("LOG_SAMPLE_RATES", "")
+
+# Retention purge of old messages and sessions; RETENTION_DAYS=0 disables it
+RETENTION_DAYS = env_float("RETENTION_DAYS", 0)
+RETENTION_INTERVAL = env_float("RETENTION_INTERVAL", 3600)
+RETENTION_BATCH_SIZE = env_int("RETENTION_BATCH_SIZE", 500)
+RETENTION_BATCH_PAUSE = env_float("RETENTION_BATCH_PAUSE", 0.05)
+RETENTION_ANALYZE_THRESHOLD = env_int("RETENTION_ANALYZE_THRESHOLD", 10000)
+RETENTION_VACUUM_INTERVAL = env_float("RETENTION_VACUUM_INTERVAL", 7 * 24 * 3600)
+# The purge runs only in the process with index 0, so workers don't VACUUM the same
+# database at once. src.server sets it per worker; other launchers can set it by env.
+SERVER_WORKER_INDEX = env_int("SERVER_WORKER_INDEX", 0)
+
+# Message persistence: direct (one transaction per request) | batched (write-behind buffer).
+# MESSAGE_DURABILITY=commit holds the response until the batch is committed,
+# MESSAGE_DURABILITY=buffer answers once the message is buffered.
+MESSAGE_WRITE_MODE = env_str("MESSAGE_WRITE_MODE", "direct")
+MESSAGE_DURABILITY = env_str("MESSAGE_DURABILITY", "commit")
+MESSAGE_BATCH_SIZE = env_int("MESSAGE_BATCH_SIZE", 200)
+MESSAGE_BATCH_INTERVAL_MS = env_float("MESSAGE_BATCH_INTERVAL_MS", 20)
+MESSAGE_MAX_PENDING = env_int("MESSAGE_MAX_PENDING", 10000)
+
+# History export/import: rows per server-side cursor fetch (and per streamed chunk),
+# rows per import transaction and the longest decompressed import line accepted.
+# ADMIN_USERNAMES (comma-separated) may use the whole-database dump and the import.
+EXPORT_YIELD_PER = env_int("EXPORT_YIELD_PER", 2000)
+IMPORT_BATCH_SIZE = env_int("IMPORT_BATCH_SIZE", 2000)
+IMPORT_MAX_LINE_BYTES = env_int("IMPORT_MAX_LINE_BYTES", 1024 * 1024)
+ADMIN_USERNAMES = frozenset(name.strip() for name in env_str("ADMIN_USERNAMES", "").split(",") if name.strip())
+
+# Token-bucket rate limits: RATE (> 0) per second refilled up to BURST (>= 1) requests.
+# Chat routes are limited per user, auth routes per client IP. RATE_LIMIT_STORE
+# names a "module:Class" RateLimitStore shared between workers (in-memory if empty).
+RATE_LIMIT_ENABLED = env_bool("RATE_LIMIT_ENABLED", True)
+RATE_LIMIT_STORE = env_str("RATE_LIMIT_STORE", "")
+RATE_LIMIT_CHAT_RATE = env_positive_float("RATE_LIMIT_CHAT_RATE", 5)
+RATE_LIMIT_CHAT_BURST = env_float_at_least("RATE_LIMIT_CHAT_BURST", 30, 1)
+RATE_LIMIT_AUTH_RATE = env_positive_float("RATE_LIMIT_AUTH_RATE", 1)
+RATE_LIMIT_AUTH_BURST = env_float_at_least("RATE_LIMIT_AUTH_BURST", 20, 1)
+# Auth requests (Argon2) running at once in one process; 0 disables the cap
+RATE_LIMIT_AUTH_CONCURRENCY = env_int("RATE_LIMIT_AUTH_CONCURRENCY", 16)
+
+# Process startup: open the DB pools, compile bot intents, start hashing workers
+# and run the hot queries once before accepting traffic
+WARM_STARTUP = env_bool("WARM_STARTUP", True)
+# src.server launcher: worker processes and how long a draining worker may finish requests
+SERVER_WORKERS = env_int("SERVER_WORKERS", os.cpu_count() or 1)
+SERVER_GRACEFUL_TIMEOUT = env_float("SERVER_GRACEFUL_TIMEOUT", 30)
+
+# Sampling profiler: dump collapsed stacks for requests slower than this (0 disables)
+PROFILE_SLOW_REQUEST_MS = env_float("PROFILE_SLOW_REQUEST_MS", 0)
+PROFILE_SAMPLE_INTERVAL_MS = env_float("PROFILE_SAMPLE_INTERVAL_MS", 5)
+PROFILE_DIR = env_str("PROFILE_DIR", "profiles")
@@ -1,8 +1,73 @@
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+import re
 
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker
 
-DATABASE_ASYNC = "sqlite+aiosqlite:///chatbot.db"
-DATABASE_SYNC = "sqlite:///chatbot.db"
+from src.core import config
+from src.core.instrumentation import instrument_engine
 
-engine = create_async_engine(url=DATABASE_ASYNC, echo=True)
+
+DATABASE_ASYNC = config.DATABASE_URL
+DATABASE_SYNC = re.sub(r"^(\w+)\+\w+", r"\1", DATABASE_ASYNC)
+
+
+def sqlite_pragmas(read_only: bool = False) -> list[str]:
+    pragmas = [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        f"PRAGMA busy_timeout={config.SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA mmap_size={config.SQLITE_MMAP_SIZE}",
+        f"PRAGMA cache_size=-{config.SQLITE_CACHE_SIZE_KB}",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only=ON")
+    return pragmas
+
+
+def postgres_engine_options(pool_size: int, read_only: bool = False) -> dict:
+    options = {
+        "pool_size": pool_size,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT,
+        "pool_recycle": config.DB_POOL_RECYCLE,
+        "pool_pre_ping": config.DB_POOL_PRE_PING,
+        "connect_args": {
+            "statement_cache_size": config.PG_STATEMENT_CACHE_SIZE,
+            "prepared_statement_cache_size": config.PG_PREPARED_STATEMENT_CACHE_SIZE,
+        },
+    }
+    if read_only:
+        options["execution_options"] = {"postgresql_readonly": True}
+    return options
+
+
+def build_engine(url: str,
+                 pool_size: int,
+                 read_only: bool = False,
+                 profile: str = config.DATABASE_PROFILE,
+                 echo: bool = config.DATABASE_ECHO,
+                 **kwargs) -> AsyncEngine:
+    if url.startswith("postgresql"):
+        kwargs = {**postgres_engine_options(pool_size, read_only), **kwargs}
+    elif ":memory:" not in url and "poolclass" not in kwargs:
+        kwargs["pool_size"] = pool_size
+    engine = create_async_engine(url=url, echo=echo, **kwargs)
+    instrument_engine(engine, "read" if read_only else "write")
+
+    if engine.dialect.name == "sqlite" and profile == "production":
+        pragmas = sqlite_pragmas(read_only)
+
+        @event.listens_for(engine.sync_engine, "connect")
+        def apply_pragmas(dbapi_connection, connection_record):
+            cursor = dbapi_connection.cursor()
+            for pragma in pragmas:
+                cursor.execute(pragma)
+            cursor.close()
+
+    return engine
+
+
+engine = build_engine(DATABASE_ASYNC, pool_size=config.DB_WRITE_POOL_SIZE)
+read_engine = build_engine(config.DATABASE_READ_URL, pool_size=config.DB_READ_POOL_SIZE, read_only=True)
 AsyncSessionMaker = async_sessionmaker(bind=engine, expire_on_commit=False)
+ReadSessionMaker = async_sessionmaker(bind=read_engine, expire_on_commit=False)
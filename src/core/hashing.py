@@ -0,0 +1,97 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, TypeVar
+
+from src.core import config
+from src.core.metrics import Counter, Gauge, Histogram
+from src.core.security import get_password_hash, verify_password
+
+
+T = TypeVar("T")
+
+HASH_IN_FLIGHT = Gauge("password_hash_in_flight", "Password hash jobs running or queued")
+HASH_QUEUE_DEPTH = Gauge("password_hash_queue_depth", "Password hash jobs waiting for a free worker")
+HASH_LATENCY = Histogram("password_hash_seconds", "Password hash/verify latency including queueing",
+                         labelnames=("operation",))
+HASH_REJECTED = Counter("password_hash_rejected_total", "Password hash jobs rejected because the pool was full")
+
+
+class HashingPoolBusyError(Exception):
+    pass
+
+
+class PasswordHashingPool:
+    """Runs Argon2 off the event loop and refuses work once ``max_pending`` jobs are queued."""
+
+    def __init__(self, kind: str, max_workers: int, max_pending: int):
+        if kind not in ("thread", "process", "inline"):
+            raise ValueError(f"Unknown hashing pool kind: {kind}")
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max(0, max_pending)
+        self._executor: Executor | None = None
+        self._in_flight = 0
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="password-hash")
+        return self._executor
+
+    def _update_gauges(self):
+        HASH_IN_FLIGHT.set(self._in_flight)
+        HASH_QUEUE_DEPTH.set(max(0, self._in_flight - self.max_workers))
+
+    async def run(self, operation: str, func: Callable[..., T], *args) -> T:
+        started = time.perf_counter()
+        if self.kind == "inline":
+            try:
+                return func(*args)
+            finally:
+                HASH_LATENCY.observe(time.perf_counter() - started, operation=operation)
+
+        if self._in_flight >= self.max_workers + self.max_pending:
+            HASH_REJECTED.inc()
+            raise HashingPoolBusyError()
+
+        self._in_flight += 1
+        self._update_gauges()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self._in_flight -= 1
+            self._update_gauges()
+            HASH_LATENCY.observe(time.perf_counter() - started, operation=operation)
+
+    async def warm_up(self):
+        """Start every worker (threads or processes) and load the hasher before real traffic arrives."""
+        sample = get_password_hash("warm-up")
+        workers = 1 if self.kind == "inline" else self.max_workers
+        await asyncio.gather(*(self.run("verify", verify_password, "warm-up", sample) for _ in range(workers)))
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+hashing_pool = PasswordHashingPool(kind=config.HASH_POOL_KIND,
+                                   max_workers=config.HASH_POOL_WORKERS,
+                                   max_pending=config.HASH_POOL_MAX_PENDING)
+
+
+async def hash_password(password: str) -> str:
+    return await hashing_pool.run("hash", get_password_hash, password)
+
+
+async def check_password(plain_password: str, hashed_password: str) -> bool:
+    return await hashing_pool.run("verify", verify_password, plain_password, hashed_password)
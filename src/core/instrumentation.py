@@ -0,0 +1,107 @@
+import asyncio
+import re
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from src.core import config
+from src.core.metrics import Histogram
+from src.core.profiling import SamplingProfiler
+
+
+REQUEST_SECONDS = Histogram("http_request_duration_seconds", "HTTP request latency",
+                            labelnames=("method", "route", "status"))
+DB_QUERY_SECONDS = Histogram("db_query_duration_seconds", "Duration of a single SQL statement",
+                             labelnames=("engine",))
+DB_QUERIES_PER_REQUEST = Histogram("db_queries_per_request", "SQL statements executed per HTTP request",
+                                   labelnames=("route",), buckets=(0, 1, 2, 3, 4, 5, 7, 10, 15, 20, 50))
+DB_SECONDS_PER_REQUEST = Histogram("db_seconds_per_request", "Time spent in SQL per HTTP request",
+                                   labelnames=("route",))
+
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_seconds: float = 0.0
+
+
+_request_stats: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def current_request_stats() -> RequestStats | None:
+    return _request_stats.get()
+
+
+def instrument_engine(engine: AsyncEngine, name: str):
+    """Time every statement on the engine and attribute it to the current request."""
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        DB_QUERY_SECONDS.observe(elapsed, engine=name)
+        stats = _request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_seconds += elapsed
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(exception_context):
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_started"):
+            connection.info["query_started"].pop()
+
+
+profiler = SamplingProfiler(interval=config.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and SQL usage per route template and status.
+
+    When PROFILE_SLOW_REQUEST_MS is set, the sampling profiler runs on the
+    event loop thread and slow requests get their samples dumped to PROFILE_DIR.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        if config.PROFILE_SLOW_REQUEST_MS > 0 and not profiler.running:
+            profiler.start()
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            finished = time.perf_counter()
+            _request_stats.reset(token)
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_SECONDS.observe(finished - started, method=scope["method"], route=route, status=status)
+            DB_QUERIES_PER_REQUEST.observe(stats.queries, route=route)
+            DB_SECONDS_PER_REQUEST.observe(stats.db_seconds, route=route)
+            if profiler.running and (finished - started) * 1000 >= config.PROFILE_SLOW_REQUEST_MS:
+                slug = re.sub(r"[^\w-]+", "_", f"{scope['method']}{route}").strip("_")
+                path = f"{config.PROFILE_DIR}/{datetime.now():%Y%m%d-%H%M%S-%f}-{slug}.folded"
+                await asyncio.to_thread(profiler.dump, path, started, finished)
@@ -1,13 +1,191 @@
+import atexit
+import glob
+import json
 import os
+import queue
+import random
+import sys
+import threading
+import time
+import traceback
+import zipfile
+from datetime import datetime
 from loguru import logger
 
+from src.core import config
+from src.core.metrics import Counter
 
-def setup_logging():
+
+TEXT_FORMAT = "{time:HH:mm:ss} | {level:8} | {name}:{function}:{line} | {message}"
+ROTATION_BYTES = 10 * 1024 * 1024
+RETENTION_SECONDS = 7 * 24 * 60 * 60
+
+DROPPED_RECORDS = Counter("log_records_dropped_total", "Log records the file writer never wrote",
+                          labelnames=("reason",))
+
+
+def compress_in_background(path: str):
+    """Zip a rotated log file on a separate thread so the writer never waits for it."""
+    def compress():
+        archive = f"{path}.zip"
+        with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_DEFLATED) as zip_file:
+            zip_file.write(path, arcname=os.path.basename(path))
+        os.remove(path)
+
+    threading.Thread(target=compress, name="log-compression").start()
+
+
+def format_text(record: dict) -> str:
+    line = (f"{record['time']:%H:%M:%S} | {record['level'].name:8} | "
+            f"{record['name']}:{record['function']}:{record['line']} | {record['message']}\n")
+    if record["exception"] is not None:
+        line += "".join(traceback.format_exception(*record["exception"]))
+    return line
+
+
+def format_json(record: dict) -> str:
+    data = {
+        "time": record["time"].isoformat(),
+        "level": record["level"].name,
+        "logger": record["name"],
+        "function": record["function"],
+        "line": record["line"],
+        "message": record["message"],
+        **record["extra"],
+    }
+    if record["exception"] is not None:
+        data["exception"] = "".join(traceback.format_exception(*record["exception"]))
+    return json.dumps(data, ensure_ascii=False, default=str) + "\n"
+
+
+class QueuedFileSink:
+    """Loguru sink that only enqueues the record on the calling thread.
+
+    A writer thread formats records, writes them in batches, rotates the file
+    by size and hands rotated files to background compression. The queue holds
+    at most ``max_queued`` records; past that new records are dropped rather
+    than blocking the request or growing memory. A record that fails to format
+    or write is reported to stderr and skipped, and the file is reopened on the
+    next one. Both kinds of loss are counted in ``log_records_dropped_total``.
+    """
+
+    def __init__(self, path: str, formatter=format_text,
+                 rotation_bytes: int = ROTATION_BYTES, retention_seconds: float = RETENTION_SECONDS,
+                 max_queued: int = config.LOG_QUEUE_SIZE):
+        self.path = path
+        self.formatter = formatter
+        self.rotation_bytes = rotation_bytes
+        self.retention_seconds = retention_seconds
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, max_queued))
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def __call__(self, message):
+        try:
+            self._queue.put_nowait(message.record)
+        except queue.Full:
+            DROPPED_RECORDS.inc(reason="queue_full")
+
+    def _run(self):
+        file = None
+        size = 0
+        while True:
+            record = self._queue.get()
+            if record is None:
+                break
+            try:
+                if file is None:
+                    file = open(self.path, "ab")
+                    size = file.tell()
+                data = self.formatter(record).encode("utf-8")
+                file.write(data)
+                size += len(data)
+                if size >= self.rotation_bytes:
+                    file.close()
+                    file = None
+                    self._rotate()
+                elif self._queue.empty():
+                    file.flush()
+            except Exception:
+                DROPPED_RECORDS.inc(reason="error")
+                print(f"log-writer: не удалось записать запись лога {record.get('message')!r}",
+                      file=sys.stderr)
+                traceback.print_exc(file=sys.stderr)
+                if file is not None and file.closed:
+                    file = None
+        if file is not None:
+            file.close()
+
+    def _rotate(self):
+        rotated = f"{self.path}.{datetime.now():%Y-%m-%d_%H-%M-%S_%f}"
+        os.rename(self.path, rotated)
+        compress_in_background(rotated)
+        deadline = time.time() - self.retention_seconds
+        for archive in glob.glob(f"{glob.escape(self.path)}.*.zip"):
+            if os.path.getmtime(archive) < deadline:
+                os.remove(archive)
+
+    def stop(self):
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+
+def parse_sample_rates(value: str) -> dict[str, float]:
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(","))):
+        route, _, rate = item.partition("=")
+        rates[route.strip()] = float(rate)
+    return rates
+
+
+SAMPLE_RATES = parse_sample_rates(config.LOG_SAMPLE_RATES)
+
+
+class _DroppedLogger:
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+_dropped = _DroppedLogger()
+
+
+def sampled(route: str):
+    """Logger for a high-volume INFO line; a dropped sample skips formatting entirely."""
+    rate = SAMPLE_RATES.get(route, 1.0)
+    if rate < 1.0 and random.random() >= rate:
+        return _dropped
+    return logger.bind(route=route)
+
+
+_file_sink: QueuedFileSink | None = None
+
+
+def shutdown_logging():
+    global _file_sink
     logger.remove()
-    os.makedirs("logs", exist_ok=True)
-    logger.add(sink="logs/app.log",
-               level="INFO",
-               format="{time:HH:mm:ss} | {level:8} | {name}:{function}:{line} | {message}",
-               rotation="10 MB",
-               retention="7 day",
-               compression="zip")
+    if _file_sink is not None:
+        _file_sink.stop()
+        _file_sink = None
+
+
+def setup_logging():
+    global _file_sink
+    shutdown_logging()
+    os.makedirs(os.path.dirname(config.LOG_PATH) or ".", exist_ok=True)
+    if not config.LOG_ENQUEUE:
+        logger.add(sink=config.LOG_PATH,
+                   level=config.LOG_LEVEL,
+                   format=TEXT_FORMAT,
+                   serialize=config.LOG_FORMAT == "json",
+                   rotation="10 MB",
+                   retention="7 day",
+                   compression="zip")
+        return
+
+    formatter = format_json if config.LOG_FORMAT == "json" else format_text
+    _file_sink = QueuedFileSink(config.LOG_PATH, formatter=formatter)
+    logger.add(sink=_file_sink, level=config.LOG_LEVEL, format="{message}")
+
+
+atexit.register(shutdown_logging)
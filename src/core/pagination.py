@@ -0,0 +1,24 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(sent_at: datetime, row_id: int | str) -> str:
+    raw = json.dumps([sent_at.isoformat(), row_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int | str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sent_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(row_id, (int, str)):
+            raise InvalidCursorError(cursor)
+        return datetime.fromisoformat(sent_at), row_id
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError) as e:
+        raise InvalidCursorError(cursor) from e
@@ -0,0 +1,66 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+
+class SamplingProfiler:
+    """Samples the stack of one thread (the event loop) at a fixed interval.
+
+    Samples are kept in a bounded ring buffer; ``dump`` writes the ones taken
+    during a time window in the collapsed-stack format that flamegraph.pl and
+    speedscope read. Under asyncio the window also contains frames of other
+    requests that were running concurrently.
+    """
+
+    def __init__(self, interval: float, max_samples: int = 100_000):
+        self.interval = interval
+        self._samples: deque[tuple[float, str]] = deque(maxlen=max_samples)
+        self._thread_id: int | None = None
+        self._stop = threading.Event()
+        self._sampler: threading.Thread | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._sampler is not None
+
+    def start(self, thread_id: int | None = None):
+        if self._sampler is not None:
+            return
+        self._thread_id = thread_id or threading.get_ident()
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._sampler.start()
+
+    def stop(self):
+        if self._sampler is None:
+            return
+        self._stop.set()
+        self._sampler.join()
+        self._sampler = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self._samples.append((time.perf_counter(), ";".join(reversed(stack))))
+
+    def collapsed(self, started: float, finished: float) -> Counter:
+        return Counter(stack for timestamp, stack in list(self._samples) if started <= timestamp <= finished)
+
+    def dump(self, path: str, started: float, finished: float) -> int:
+        stacks = self.collapsed(started, finished)
+        if not stacks:
+            return 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            for stack, count in stacks.most_common():
+                file.write(f"{stack} {count}\n")
+        return sum(stacks.values())
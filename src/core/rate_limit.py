@@ -0,0 +1,107 @@
+import importlib
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from src.core import config
+from src.core.metrics import Counter, Gauge
+
+
+RATE_LIMITED = Counter("rate_limit_rejected_total", "Requests rejected by a rate or concurrency limit",
+                       labelnames=("limit",))
+CONCURRENCY_IN_FLIGHT = Gauge("concurrency_limit_in_flight", "Requests holding a concurrency slot",
+                              labelnames=("limit",))
+
+
+class RateLimitExceededError(Exception):
+    def __init__(self, limit: str, retry_after: float):
+        super().__init__(limit)
+        self.limit = limit
+        self.retry_after = retry_after
+
+
+class RateLimitStore(ABC):
+    """Keeps token buckets. Implementations backed by a shared service let workers share limits."""
+
+    @abstractmethod
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1) -> float:
+        """Take ``cost`` tokens from the bucket of ``key`` refilled at ``rate`` per second up to ``burst``.
+
+        Returns 0 when the tokens were taken, otherwise the seconds until enough are available.
+        """
+
+
+class InMemoryRateLimitStore(RateLimitStore):
+    """Per-process buckets; the least recently used ones are dropped past ``max_keys``."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    async def take(self, key: str, rate: float, burst: float, cost: float = 1) -> float:
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (burst, now))
+        tokens = min(burst, tokens + (now - updated) * rate)
+        retry_after = 0.0
+        if tokens >= cost:
+            tokens -= cost
+        else:
+            retry_after = (cost - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+
+def load_store(path: str) -> RateLimitStore:
+    """Build the store named by ``module:Class``; an empty path selects the in-memory store."""
+    if not path:
+        return InMemoryRateLimitStore()
+    module_name, _, class_name = path.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+class RateLimiter:
+    def __init__(self, store: RateLimitStore, enabled: bool = True):
+        self.store = store
+        self.enabled = enabled
+
+    async def hit(self, limit: str, key: str, rate: float, burst: float):
+        if not self.enabled:
+            return
+        retry_after = await self.store.take(f"{limit}:{key}", rate, burst)
+        if retry_after > 0:
+            RATE_LIMITED.inc(limit=limit)
+            raise RateLimitExceededError(limit, retry_after)
+
+
+class ConcurrencyLimit:
+    """Caps requests running at once in this process; extra ones are rejected instead of queued.
+
+    A ``max_concurrent`` of 0 disables the cap.
+    """
+
+    def __init__(self, name: str, max_concurrent: int):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.in_flight = 0
+
+    def acquire(self):
+        if 0 < self.max_concurrent <= self.in_flight:
+            RATE_LIMITED.inc(limit=self.name)
+            raise RateLimitExceededError(self.name, retry_after=1)
+        self.in_flight += 1
+        CONCURRENCY_IN_FLIGHT.set(self.in_flight, limit=self.name)
+
+    def release(self):
+        self.in_flight -= 1
+        CONCURRENCY_IN_FLIGHT.set(self.in_flight, limit=self.name)
+
+
+def retry_after_header(retry_after: float) -> str:
+    return str(max(1, math.ceil(retry_after)))
+
+
+rate_limiter = RateLimiter(load_store(config.RATE_LIMIT_STORE), enabled=config.RATE_LIMIT_ENABLED)
+auth_concurrency = ConcurrencyLimit("auth.concurrency", config.RATE_LIMIT_AUTH_CONCURRENCY)
@@ -0,0 +1,48 @@
+import json
+from datetime import datetime
+from typing import Any
+
+from fastapi.responses import JSONResponse
+from loguru import logger
+
+from src.core import config
+
+try:
+    import orjson
+except ImportError:  # in requirements.txt; without it responses are slower, not broken
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    # Same text pydantic produces for the naive UTC timestamps we store
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+_stdlib_encode = json.JSONEncoder(ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default).encode
+
+
+def render_stdlib(content: Any) -> bytes:
+    return _stdlib_encode(content).encode()
+
+
+def render_orjson(content: Any) -> bytes:
+    return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+render_json = render_orjson if orjson is not None and config.JSON_RENDERER == "orjson" else render_stdlib
+if config.JSON_RENDERER == "orjson" and orjson is None:
+    logger.warning('JSON_RENDERER=orjson, но пакет orjson не установлен: ответы сериализуются стандартным json')
+
+
+class FastJSONResponse(JSONResponse):
+    """Default response class of the app.
+
+    Renders with orjson when it is available. Unlike JSONResponse it also
+    accepts datetimes, so a route can return rows as plain dicts and skip
+    response_model validation.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return render_json(content)
@@ -1,8 +1,12 @@
+import time
 from datetime import datetime, timedelta, timezone
 
 import jwt
 from pwdlib import PasswordHash
 
+from src.core import config
+from src.core.cache import TTLCache
+
 SECRET_KEY = "secret_key_change_it_later"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
@@ -10,6 +14,8 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 password_hash = PasswordHash.recommended()
 
+token_cache = TTLCache("jwt_token", maxsize=config.TOKEN_CACHE_SIZE, ttl=config.TOKEN_CACHE_TTL)
+
 
 def get_password_hash(password: str) -> str:
     return password_hash.hash(password)
@@ -26,3 +32,18 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
+
+def decode_access_token(token: str) -> dict:
+    """Decode and verify a JWT, reusing the payload of recently seen tokens.
+
+    Raises jwt.InvalidTokenError like jwt.decode.
+    """
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+
+    payload = jwt.decode(jwt=token, key=SECRET_KEY, algorithms=[ALGORITHM])
+    expires_at = payload.get("exp")
+    ttl = expires_at - time.time() if expires_at is not None else None
+    token_cache.set(token, payload, ttl=ttl)
+    return payload
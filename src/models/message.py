@@ -1,10 +1,18 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import Literal
-from datetime import datetime
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, CheckConstraint, func
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, CheckConstraint, Index
 
 from src.models import Base
 
+
+CLIENT_MESSAGE_ID_MAX_LENGTH = 64
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 class Message(Base):
     __tablename__ = "messages"
 
@@ -12,10 +20,18 @@ class Message(Base):
     session_id = Column(String, ForeignKey("sessions.id", ondelete="CASCADE"), nullable=False)
     sender_type = Column(String, nullable=False)
     text = Column(String, nullable=False)
-    sent_at = Column(DateTime, default=func.now())
+    sent_at = Column(DateTime, default=utcnow)
+    # Idempotency key of a user message; a retried submission reuses it, and the bot reply
+    # to that message is stored under the same key
+    client_message_id = Column(String, nullable=True)
 
     __table_args__ = (
         CheckConstraint("sender_type IN ('user', 'bot')", name="check_sender_type"),
+        Index("ix_messages_session_id_sent_at_id", "session_id", "sent_at", "id"),
+        # Partial: almost every row has no key, and the planner must not mistake it for a history index
+        Index("ux_messages_session_id_client_message_id_sender_type", "session_id", "client_message_id", "sender_type",
+              unique=True,
+              sqlite_where=client_message_id.isnot(None), postgresql_where=client_message_id.isnot(None)),
     )
 
 
@@ -26,7 +42,43 @@ class MessageBase(BaseModel):
 
 class MessageCreate(MessageBase):
     session_id: str
+    client_message_id: str | None = Field(None, min_length=1, max_length=CLIENT_MESSAGE_ID_MAX_LENGTH)
 
 
 class MessageOut(MessageBase):
     sent_at: datetime
+
+
+class MessagePage(BaseModel):
+    items: list[MessageOut]
+    next_cursor: str | None = None
+
+
+class MessageSearchHit(BaseModel):
+    id: int
+    session_id: str
+    sender_type: Literal["user", "bot"]
+    sent_at: datetime
+    snippet: str
+
+
+class MessageSearchPage(BaseModel):
+    items: list[MessageSearchHit]
+    next_cursor: str | None = None
+
+
+class MessageExport(BaseModel):
+    """One NDJSON line of a history export, and of an import."""
+    session_id: str = Field(..., min_length=1, max_length=36)
+    user_id: int
+    sender_type: Literal["user", "bot"]
+    text: str = Field(..., min_length=1)
+    sent_at: datetime
+
+    @field_validator("sent_at")
+    @classmethod
+    def naive_utc(cls, value: datetime) -> datetime:
+        # Stored timestamps are naive UTC (see utcnow)
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
@@ -0,0 +1,65 @@
+from sqlalchemy import DDL, event
+
+from src.models.message import Message
+
+
+def indexed_text(row: str) -> str:
+    # U+E000/U+E001 mark snippet matches; stored copies become U+E002/U+E003, which
+    # tokenize the same but can never be read back as a marker
+    return f"replace(replace({row}.text, char(57344), char(57346)), char(57345), char(57347))"
+
+
+# SQLite: an external-content FTS5 table over a view that adds the owner of
+# each message, so a user's search is an index intersection instead of a
+# join filter. Triggers keep it in sync with inserts, deletes and edits.
+SQLITE_SEARCH_DDL = [
+    f"""CREATE VIEW IF NOT EXISTS messages_search AS
+       SELECT messages.id AS id, {indexed_text('messages')} AS text, sessions.user_id AS user_id
+       FROM messages JOIN sessions ON sessions.id = messages.session_id""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+       text, user_id, content='messages_search', content_rowid='id', tokenize='unicode61')""",
+    f"""CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+       INSERT INTO messages_fts(rowid, text, user_id)
+       SELECT new.id, {indexed_text('new')}, user_id FROM sessions WHERE id = new.session_id;
+       END""",
+    f"""CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+       INSERT INTO messages_fts(messages_fts, rowid, text, user_id)
+       SELECT 'delete', old.id, {indexed_text('old')}, user_id FROM sessions WHERE id = old.session_id;
+       END""",
+    f"""CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE OF text, session_id ON messages BEGIN
+       INSERT INTO messages_fts(messages_fts, rowid, text, user_id)
+       SELECT 'delete', old.id, {indexed_text('old')}, user_id FROM sessions WHERE id = old.session_id;
+       INSERT INTO messages_fts(rowid, text, user_id)
+       SELECT new.id, {indexed_text('new')}, user_id FROM sessions WHERE id = new.session_id;
+       END""",
+]
+
+SQLITE_SEARCH_DROP = [
+    "DROP TRIGGER IF EXISTS messages_fts_update",
+    "DROP TRIGGER IF EXISTS messages_fts_delete",
+    "DROP TRIGGER IF EXISTS messages_fts_insert",
+    "DROP TABLE IF EXISTS messages_fts",
+    "DROP VIEW IF EXISTS messages_search",
+]
+
+# PostgreSQL: an expression index matched by to_tsvector('russian', text) @@ ...
+POSTGRES_SEARCH_DDL = [
+    "CREATE INDEX IF NOT EXISTS ix_messages_text_fts ON messages USING gin (to_tsvector('russian', text))",
+]
+
+POSTGRES_SEARCH_DROP = [
+    "DROP INDEX IF EXISTS ix_messages_text_fts",
+]
+
+# Schema objects created here rather than declared on the models; Alembic autogenerate skips them
+SEARCH_OBJECT_PREFIXES = ("messages_fts", "messages_search", "ix_messages_text_fts")
+
+
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(Message.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+for statement in SQLITE_SEARCH_DROP:
+    event.listen(Message.__table__, "before_drop", DDL(statement).execute_if(dialect="sqlite"))
+for statement in POSTGRES_SEARCH_DDL:
+    event.listen(Message.__table__, "after_create", DDL(statement).execute_if(dialect="postgresql"))
+for statement in POSTGRES_SEARCH_DROP:
+    event.listen(Message.__table__, "before_drop", DDL(statement).execute_if(dialect="postgresql"))
@@ -1,10 +1,38 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, func
+from datetime import datetime
+from pydantic import BaseModel, Field
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index
 
 from src.models import Base
+from src.models.message import utcnow
 
 class Session(Base):
     __tablename__ = "sessions"
 
     id = Column(String(36), primary_key=True)
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
-    created_date = Column(DateTime, default=func.now())
\ No newline at end of file
+    created_date = Column(DateTime, default=utcnow)
+    # Denormalized from messages so listing sessions never touches the messages table
+    message_count = Column(Integer, nullable=False, default=0, server_default="0")
+    last_message_text = Column(String, nullable=True)
+    last_message_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_sessions_user_id_created_date_id", "user_id", "created_date", "id"),
+    )
+
+
+class SessionOut(BaseModel):
+    id: str
+    created_date: datetime
+    message_count: int
+    last_message_text: str | None = None
+    last_message_at: datetime | None = None
+
+
+class SessionPage(BaseModel):
+    items: list[SessionOut]
+    next_cursor: str | None = None
+
+
+class SessionBulkDelete(BaseModel):
+    session_ids: list[str] = Field(min_length=1, max_length=500)
@@ -1,23 +1,212 @@
-from sqlalchemy import select, delete
+from datetime import datetime
+from typing import AsyncIterator
+
+from sqlalchemy import Row, select, delete, insert, and_, or_, column, func, literal_column, table
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.models.message import Message, MessageCreate
+from src.models.message import Message, MessageCreate, MessageExport, utcnow
+from src.models.session import Session
+from src.models.user import User
+from src.repositories import sessions as sessions_repo
+from src.services.search import (HIGHLIGHT_END, HIGHLIGHT_START, STORED_HIGHLIGHT_END, STORED_HIGHLIGHT_START,
+                                 fts5_query, tsquery)
+
+
+class UnknownUserError(Exception):
+    def __init__(self, user_id: int):
+        super().__init__(f"user {user_id} does not exist")
+        self.user_id = user_id
 
 
 async def get_messages_by_session_id(session: AsyncSession, session_id: str):
-    statement = select(Message).where(Message.session_id == session_id)
+    statement = (select(Message)
+                 .where(Message.session_id == session_id)
+                 .order_by(Message.sent_at, Message.id))
     result = await session.execute(statement)
     messages = result.scalars().all()
     return messages
 
 
+async def get_messages_page(session: AsyncSession,
+                            session_id: str,
+                            limit: int,
+                            before: tuple[datetime, int] | None = None,
+                            after: tuple[datetime, int] | None = None) -> tuple[list[Row], bool]:
+    """Keyset page over (sent_at, id), always returned in chronological order.
+
+    Without a cursor the newest page is returned; ``before`` walks back in time,
+    ``after`` walks forward. The second value tells whether more rows exist in
+    the walking direction. Rows carry only what a history page shows plus the
+    id for its cursor; no ORM objects are built.
+    """
+    statement = (select(Message.id, Message.sender_type, Message.text, Message.sent_at)
+                 .where(Message.session_id == session_id))
+    if after is not None:
+        sent_at, message_id = after
+        statement = statement.where(or_(Message.sent_at > sent_at,
+                                        and_(Message.sent_at == sent_at, Message.id > message_id)))
+        statement = statement.order_by(Message.sent_at, Message.id)
+    else:
+        if before is not None:
+            sent_at, message_id = before
+            statement = statement.where(or_(Message.sent_at < sent_at,
+                                            and_(Message.sent_at == sent_at, Message.id < message_id)))
+        statement = statement.order_by(Message.sent_at.desc(), Message.id.desc())
+
+    result = await session.execute(statement.limit(limit + 1))
+    messages = list(result.all())
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    if after is None:
+        messages.reverse()
+    return messages, has_more
+
+
+SNIPPET_TOKENS = 12
+# A control character parses as a blank, so no tag starts at it and no match absorbs it
+TAG_MASK = "\x01"
+
+
+async def search_messages(session: AsyncSession,
+                          user_id: int,
+                          terms: list[str],
+                          limit: int,
+                          before: tuple[datetime, int] | None = None) -> tuple[list[Row], bool]:
+    """Keyset page of the user's messages matching every term, newest first.
+
+    Rows carry id, session_id, sender_type, sent_at and a snippet with match
+    markers (HIGHLIGHT_START/HIGHLIGHT_END) around the hits.
+    """
+    columns = (Message.id, Message.session_id, Message.sender_type, Message.sent_at)
+    if session.get_bind().dialect.name == "postgresql":
+        query = func.to_tsquery(literal_column("'russian'"), tsquery(terms))
+        # The parser reads "<b>" in a message as a tag, which ts_headline leaves out
+        stored = func.translate(Message.text, HIGHLIGHT_START + HIGHLIGHT_END,
+                                STORED_HIGHLIGHT_START + STORED_HIGHLIGHT_END)
+        masked = func.replace(stored, "<", TAG_MASK)
+        snippet = func.replace(func.ts_headline(literal_column("'russian'"), masked, query,
+                                                f"StartSel={HIGHLIGHT_START}, StopSel={HIGHLIGHT_END}, "
+                                                f"MaxWords={SNIPPET_TOKENS * 2}, MinWords={SNIPPET_TOKENS // 2}"),
+                               TAG_MASK, "<")
+        statement = (select(*columns, snippet.label("snippet"))
+                     .join(Session, Session.id == Message.session_id)
+                     .where(Session.user_id == user_id,
+                            func.to_tsvector(literal_column("'russian'"), Message.text).op("@@")(query)))
+    else:
+        fts = table("messages_fts", column("rowid"))
+        match = f'user_id : "{user_id}" AND text : ({fts5_query(terms)})'
+        snippet = func.snippet(literal_column("messages_fts"), 0, HIGHLIGHT_START, HIGHLIGHT_END, "…", SNIPPET_TOKENS)
+        statement = (select(*columns, snippet.label("snippet"))
+                     .select_from(fts)
+                     .join(Message, Message.id == fts.c.rowid)
+                     .where(literal_column("messages_fts").op("MATCH")(match)))
+
+    if before is not None:
+        sent_at, message_id = before
+        statement = statement.where(or_(Message.sent_at < sent_at,
+                                        and_(Message.sent_at == sent_at, Message.id < message_id)))
+    statement = statement.order_by(Message.sent_at.desc(), Message.id.desc()).limit(limit + 1)
+
+    rows = list((await session.execute(statement)).all())
+    return rows[:limit], len(rows) > limit
+
+
+async def get_reply_by_client_message_id(session: AsyncSession, session_id: str,
+                                        client_message_id: str) -> tuple[Message, Message | None] | None:
+    """The message stored under an idempotency key and, for a user turn, the bot reply saved with it."""
+    statement = select(Message).where(Message.session_id == session_id,
+                                      Message.client_message_id == client_message_id)
+    by_sender = {message.sender_type: message for message in (await session.execute(statement)).scalars()}
+    if "user" in by_sender:
+        return by_sender["user"], by_sender.get("bot")
+    if "bot" in by_sender:
+        return by_sender["bot"], None
+    return None
+
+
+async def stream_export_batches(session: AsyncSession,
+                                yield_per: int,
+                                session_id: str | None = None,
+                                user_id: int | None = None) -> AsyncIterator[list[Row]]:
+    """Batches of MessageExport fields from a server-side cursor, ``yield_per`` rows per fetch.
+
+    One session comes out in chronological order, one user's sessions oldest
+    first with their messages in order, everything else in insertion order.
+    """
+    statement = (select(Message.session_id, Session.user_id, Message.sender_type, Message.text, Message.sent_at)
+                 .join(Session, Session.id == Message.session_id))
+    if session_id is not None:
+        statement = statement.where(Message.session_id == session_id).order_by(Message.sent_at, Message.id)
+    elif user_id is not None:
+        # Walks ix_sessions_user_id_created_date_id, then each session's history index, so at most
+        # one session is ever sorted in memory
+        statement = (statement.where(Session.user_id == user_id)
+                     .order_by(Session.created_date, Session.id, Message.sent_at, Message.id))
+    else:
+        statement = statement.order_by(Message.id)
+
+    result = await session.stream(statement.execution_options(yield_per=yield_per))
+    async for partition in result.partitions():
+        yield partition
+
+
+async def import_messages(session: AsyncSession, messages: list[MessageExport]) -> int:
+    """Insert one batch of exported messages and commit; returns the number of sessions created.
+
+    Missing sessions are created for the user named in their lines; a session
+    that already exists keeps its owner.
+    """
+    session_ids = {message.session_id for message in messages}
+    existing = set((await session.execute(select(Session.id).where(Session.id.in_(session_ids)))).scalars())
+    new_sessions: dict[str, dict] = {}
+    for message in messages:
+        if message.session_id in existing:
+            continue
+        entry = new_sessions.setdefault(message.session_id, {"id": message.session_id, "user_id": message.user_id,
+                                                             "created_date": message.sent_at})
+        entry["created_date"] = min(entry["created_date"], message.sent_at)
+    if new_sessions:
+        user_ids = {entry["user_id"] for entry in new_sessions.values()}
+        known = set((await session.execute(select(User.id).where(User.id.in_(user_ids)))).scalars())
+        if user_ids - known:
+            await session.rollback()
+            raise UnknownUserError(min(user_ids - known))
+        await session.execute(insert(Session), list(new_sessions.values()))
+
+    await session.execute(insert(Message), [{"session_id": message.session_id,
+                                             "sender_type": message.sender_type,
+                                             "text": message.text,
+                                             "sent_at": message.sent_at} for message in messages])
+    await sessions_repo.record_messages(session, messages)
+    await session.commit()
+    return len(new_sessions)
+
+
 async def save_message(session: AsyncSession, message_create: MessageCreate):
-    new_message = Message(**message_create.model_dump())
+    new_message = Message(**message_create.model_dump(), sent_at=utcnow())
     session.add(new_message)
+    await sessions_repo.record_messages(session, [new_message])
     await session.commit()
 
 
-async def delete_messages_by_session_id(session: AsyncSession, session_id: str):
-    statement = delete(Message).where(Message.session_id == session_id)
-    await session.execute(statement)
-    await session.commit()
\ No newline at end of file
+async def save_exchange(session: AsyncSession, user_message: MessageCreate, bot_message: MessageCreate):
+    """Persist a user turn and the bot reply in a single transaction."""
+    messages = [Message(**user_message.model_dump(), sent_at=utcnow()),
+                Message(**bot_message.model_dump(), sent_at=utcnow())]
+    session.add_all(messages)
+    await sessions_repo.record_messages(session, messages)
+    await session.commit()
+
+
+async def delete_messages_older_than(session: AsyncSession, cutoff: datetime, batch_size: int) -> int:
+    """Delete one batch of messages sent before ``cutoff``."""
+    statement = select(Message.id, Message.session_id).where(Message.sent_at < cutoff).limit(batch_size)
+    rows = (await session.execute(statement)).all()
+    if rows:
+        removed: dict[str, int] = {}
+        for _, session_id in rows:
+            removed[session_id] = removed.get(session_id, 0) + 1
+        await session.execute(delete(Message).where(Message.id.in_([message_id for message_id, _ in rows])))
+        await sessions_repo.forget_messages(session, removed)
+    await session.commit()
+    return len(rows)
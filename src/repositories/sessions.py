@@ -1,12 +1,38 @@
 import uuid
+from datetime import datetime
+from sqlalchemy import DateTime, String, and_, bindparam, case, delete, exists, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from src.core import config
+from src.core.cache import TTLCache
+from src.models.message import Message
 from src.models.session import Session
 
 
-async def get_session(db_session: AsyncSession, session_id: str) -> Session | None:
-    session = await db_session.get(Session, session_id)
-    return session
+class SessionNotFoundError(Exception):
+    def __init__(self, session_ids: list[str]):
+        super().__init__(f"sessions {', '.join(session_ids)} do not exist")
+        self.session_ids = session_ids
+
+
+# session id -> owner's user id; a session never changes hands, it can only be deleted
+session_owner_cache = TTLCache("session_owner", maxsize=config.SESSION_OWNER_CACHE_SIZE,
+                               ttl=config.SESSION_OWNER_CACHE_TTL)
+
+
+async def get_session_owner(db_session: AsyncSession, session_id: str) -> int | None:
+    """Id of the user who owns the session, or None if there is no such session.
+
+    Missing sessions aren't cached, so one created on another worker is found at once.
+    """
+    user_id = session_owner_cache.get(session_id)
+    if user_id is not None:
+        return user_id
+    statement = select(Session.user_id).where(Session.id == session_id)
+    user_id = (await db_session.execute(statement)).scalar_one_or_none()
+    if user_id is not None:
+        session_owner_cache.set(session_id, user_id)
+    return user_id
 
 
 async def create_session(session: AsyncSession, user_id: int) -> Session:
@@ -14,4 +40,110 @@ async def create_session(session: AsyncSession, user_id: int) -> Session:
     new_session.id = str(uuid.uuid4())
     session.add(new_session)
     await session.commit()
+    session_owner_cache.set(new_session.id, user_id)
     return new_session
+
+
+async def get_user_sessions_page(db_session: AsyncSession,
+                                 user_id: int,
+                                 limit: int,
+                                 before: tuple[datetime, str] | None = None) -> tuple[list[Session], bool]:
+    """Keyset page of the user's sessions over (created_date, id), newest first."""
+    statement = select(Session).where(Session.user_id == user_id)
+    if before is not None:
+        created_date, session_id = before
+        statement = statement.where(or_(Session.created_date < created_date,
+                                        and_(Session.created_date == created_date, Session.id < session_id)))
+    statement = statement.order_by(Session.created_date.desc(), Session.id.desc()).limit(limit + 1)
+    sessions = list((await db_session.execute(statement)).scalars().all())
+    return sessions[:limit], len(sessions) > limit
+
+
+PREVIEW_LENGTH = 120
+
+_sessions = Session.__table__
+_batch_sent_at = bindparam("b_sent_at", type_=DateTime())
+# Imported history can be older than what the session already shows; the preview only moves forward
+_batch_is_newer = or_(_sessions.c.last_message_at.is_(None), _sessions.c.last_message_at <= _batch_sent_at)
+_record_messages = (update(_sessions)
+                    .where(_sessions.c.id == bindparam("b_session_id"))
+                    .values(message_count=_sessions.c.message_count + bindparam("b_added"),
+                            last_message_text=case((_batch_is_newer, bindparam("b_text", type_=String())),
+                                                   else_=_sessions.c.last_message_text),
+                            last_message_at=case((_batch_is_newer, _batch_sent_at),
+                                                 else_=_sessions.c.last_message_at)))
+_forget_messages = (update(_sessions)
+                    .where(_sessions.c.id == bindparam("b_session_id"))
+                    .values(message_count=_sessions.c.message_count - bindparam("b_removed"),
+                            last_message_text=case((_sessions.c.message_count <= bindparam("b_removed"), None),
+                                                   else_=_sessions.c.last_message_text),
+                            last_message_at=case((_sessions.c.message_count <= bindparam("b_removed"), None),
+                                                 else_=_sessions.c.last_message_at)))
+
+
+async def record_messages(db_session: AsyncSession, messages: list[Message]):
+    """Bump the denormalized counters of the sessions that received ``messages``.
+
+    Runs in the caller's transaction; ``messages`` must have ``sent_at`` set.
+    Raises SessionNotFoundError when one of the sessions is gone, which SQLite,
+    without foreign key enforcement, would otherwise let the messages outlive.
+    """
+    stats: dict[str, dict] = {}
+    for message in messages:
+        entry = stats.setdefault(message.session_id, {"b_session_id": message.session_id, "b_added": 0,
+                                                      "b_text": None, "b_sent_at": None})
+        entry["b_added"] += 1
+        if entry["b_sent_at"] is None or message.sent_at >= entry["b_sent_at"]:
+            entry["b_text"] = message.text[:PREVIEW_LENGTH]
+            entry["b_sent_at"] = message.sent_at
+    if stats:
+        result = await db_session.execute(_record_messages, list(stats.values()))
+        # -1 where the driver can't count an executemany; PostgreSQL has the foreign key to rely on
+        if 0 <= result.rowcount < len(stats):
+            existing = set((await db_session.execute(select(Session.id).where(Session.id.in_(stats)))).scalars())
+            raise SessionNotFoundError([session_id for session_id in stats if session_id not in existing])
+
+
+async def forget_messages(db_session: AsyncSession, removed: dict[str, int]):
+    """Take deleted messages off the session counters; a session left empty loses its preview.
+
+    Runs in the caller's transaction.
+    """
+    if removed:
+        await db_session.execute(_forget_messages, [{"b_session_id": session_id, "b_removed": count}
+                                                    for session_id, count in removed.items()])
+
+
+async def delete_session(db_session: AsyncSession, session_id: str):
+    await db_session.execute(delete(Message).where(Message.session_id == session_id))
+    await db_session.execute(delete(Session).where(Session.id == session_id))
+    await db_session.commit()
+    session_owner_cache.invalidate(session_id)
+
+
+async def delete_user_sessions(db_session: AsyncSession, user_id: int, session_ids: list[str]) -> list[str]:
+    """Delete the given sessions that belong to the user, returning the ids actually removed."""
+    statement = select(Session.id).where(Session.user_id == user_id, Session.id.in_(session_ids))
+    owned_ids = list((await db_session.execute(statement)).scalars().all())
+    if owned_ids:
+        await db_session.execute(delete(Message).where(Message.session_id.in_(owned_ids)))
+        await db_session.execute(delete(Session).where(Session.id.in_(owned_ids)))
+    await db_session.commit()
+    for session_id in owned_ids:
+        session_owner_cache.invalidate(session_id)
+    return owned_ids
+
+
+async def delete_empty_sessions_older_than(db_session: AsyncSession, cutoff: datetime, batch_size: int) -> int:
+    """Delete one batch of sessions created before ``cutoff`` that have no messages left."""
+    statement = (select(Session.id)
+                 .where(Session.created_date < cutoff,
+                        ~exists().where(Message.session_id == Session.id))
+                 .limit(batch_size))
+    session_ids = list((await db_session.execute(statement)).scalars().all())
+    if session_ids:
+        await db_session.execute(delete(Session).where(Session.id.in_(session_ids)))
+    await db_session.commit()
+    for session_id in session_ids:
+        session_owner_cache.invalidate(session_id)
+    return len(session_ids)
@@ -1,13 +1,20 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from src.core.security import get_password_hash, verify_password
+from src.core import config
+from src.core.cache import TTLCache
+from src.core.hashing import hash_password, check_password
 from src.models.user import User, UserCreate, UserUpdate
 
 
+user_cache = TTLCache("user", maxsize=config.USER_CACHE_SIZE, ttl=config.USER_CACHE_TTL)
+
+
 async def create_user(session: AsyncSession, user_create: UserCreate) -> User:
     user_data = user_create.model_dump(exclude={"password"})
-    new_user = User(**user_data, hashed_password=get_password_hash(user_create.password))
+    # Don't hold a pooled connection open while Argon2 runs
+    await session.commit()
+    new_user = User(**user_data, hashed_password=await hash_password(user_create.password))
     session.add(new_user)
     await session.commit()
     return new_user
@@ -16,12 +23,13 @@ async def update_user(session: AsyncSession, user_db: User, user_update: UserUpd
     user_data = user_update.model_dump(exclude_unset=True)
     if "password" in user_data:
         new_password = user_data.pop("password")
-        user_db.hashed_password = get_password_hash(new_password)
+        user_db.hashed_password = await hash_password(new_password)
     for key, value in user_data.items():
         setattr(user_db, key, value)
 
     session.add(user_db)
     await session.commit()
+    user_cache.invalidate(user_db.id)
     return user_db
 
 async def get_user_by_username(session: AsyncSession, username: str) -> User | None:
@@ -33,10 +41,22 @@ async def get_user_by_username(session: AsyncSession, username: str) -> User | N
 async def get_user_by_id(session: AsyncSession, user_id: int) -> User | None:
     return await session.get(User, user_id)
 
+async def get_cached_user_by_id(session: AsyncSession, user_id: int) -> User | None:
+    user = user_cache.get(user_id)
+    if user is not None:
+        return user
+    user = await get_user_by_id(session, user_id)
+    if user is not None:
+        # Cached instances outlive the request session, so keep them detached
+        session.expunge(user)
+        user_cache.set(user_id, user)
+    return user
+
 async def authenticate(session: AsyncSession, username: str, password: str) -> User | None:
     user_db = await get_user_by_username(session, username)
     if not user_db:
         return None
-    if not verify_password(password, user_db.hashed_password):
+    await session.commit()
+    if not await check_password(password, user_db.hashed_password):
         return None
     return user_db
@@ -0,0 +1,130 @@
+"""Production launcher: several uvicorn worker processes sharing one port through SO_REUSEPORT.
+
+    python -m src.server [--workers 4] [--host 0.0.0.0] [--port 8000]
+
+Each worker binds its own socket and only starts listening once the app
+lifespan has warmed it up, so the kernel never routes a connection to a
+worker that is still starting. SIGTERM or SIGINT drains every worker: it stops
+accepting, finishes in-flight requests (up to SERVER_GRACEFUL_TIMEOUT), and
+flushes buffered message writes in the lifespan shutdown. Workers that die
+unexpectedly are restarted.
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import time
+from multiprocessing.connection import wait
+
+import uvicorn
+from loguru import logger
+
+from src.core import config
+
+
+RESTART_DELAY = 1.0
+# Extra time on top of the graceful timeout before a worker is killed
+KILL_GRACE = 10.0
+
+
+def worker_log_path(path: str, index: int) -> str:
+    root, extension = os.path.splitext(path)
+    return f"{root}.worker-{index}{extension}"
+
+
+def bind_socket(host: str, port: int, reuse_port: bool) -> socket.socket:
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    # No listen() here: uvicorn calls it after the lifespan startup has finished
+    sock.bind((host, port))
+    return sock
+
+
+def run_worker(index: int, host: str, port: int, workers: int):
+    if workers > 1:
+        # Keep Ctrl+C in the terminal away from workers; the supervisor forwards one SIGTERM
+        os.setpgrp()
+        # Separate files, since every worker rotates its own log
+        config.LOG_PATH = worker_log_path(config.LOG_PATH, index)
+        config.SERVER_WORKER_INDEX = index
+    sock = bind_socket(host, port, reuse_port=workers > 1)
+    server = uvicorn.Server(uvicorn.Config("main:app",
+                                           lifespan="on",
+                                           timeout_graceful_shutdown=config.SERVER_GRACEFUL_TIMEOUT,
+                                           access_log=False,
+                                           log_level="warning"))
+    server.run(sockets=[sock])
+
+
+def supervise(host: str, port: int, workers: int, target=run_worker):
+    context = multiprocessing.get_context("spawn")
+    processes: dict[int, multiprocessing.Process] = {}
+    stopping = False
+
+    def start(index: int):
+        process = context.Process(target=target, args=(index, host, port, workers), name=f"worker-{index}")
+        process.start()
+        processes[index] = process
+
+    def stop(signum, frame):
+        nonlocal stopping
+        if stopping:
+            return
+        stopping = True
+        logger.info('Остановка: завершаем {count} воркеров', count=len(processes))
+        for process in processes.values():
+            if process.is_alive():
+                os.kill(process.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for index in range(workers):
+        start(index)
+    logger.info('Запущено воркеров: {count}, адрес {host}:{port}', count=workers, host=host, port=port)
+
+    deadline = None
+    while processes:
+        finished = wait([process.sentinel for process in processes.values()], timeout=1)
+        for index, process in list(processes.items()):
+            if process.sentinel not in finished:
+                continue
+            process.join()
+            del processes[index]
+            if not stopping:
+                logger.error('Воркер {index} завершился с кодом {code}, перезапуск',
+                             index=index, code=process.exitcode)
+                time.sleep(RESTART_DELAY)
+                # A SIGTERM during the pause has already been sent to every known worker
+                if not stopping:
+                    start(index)
+        if stopping:
+            deadline = deadline or time.monotonic() + config.SERVER_GRACEFUL_TIMEOUT + KILL_GRACE
+            if time.monotonic() > deadline:
+                for process in processes.values():
+                    process.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=config.SERVER_WORKERS)
+    args = parser.parse_args()
+
+    workers = max(1, args.workers)
+    if workers > 1 and not hasattr(socket, "SO_REUSEPORT"):
+        sys.exit("SO_REUSEPORT is not available on this platform; run with --workers 1")
+    if workers == 1:
+        run_worker(0, args.host, args.port, workers)
+    else:
+        supervise(args.host, args.port, workers)
+
+
+if __name__ == "__main__":
+    main()
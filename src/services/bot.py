@@ -1,26 +1,48 @@
-def get_bot_answer(message: str) -> str:
-    message = message.lower()
-    if "привет" in message or "здравствуй" in message:
-        return "Привет! Я бот, который был создан для ресторана VResta. Если хотите узнать все команды, напишите <b> помощь </b> или <b> команды</b>."
-    elif "помощь" in message or "команды" in message:
-        return """
-        <b> привет </b> или <b> здравствуй</b>: Приветствует пользователя. <br>
-        <b> меню</b>: Выводит меню ресторана VResta. <br>
-        <b> доставка</b>: Дает информацию о том, как решить вопросы с доставкой. <br>
-        <b> адрес</b>: Выводит местоположение ресторана VResta.
-        """
-    elif "меню" in message:
-        return """
-        <b> Путешествие в Японию </b> <br> Набор суши и сашими с самыми свежими морепродуктами, морским ежом и икрой. Виртуальная реальность — это классический японский сад с цветущей сакурой и звуками природы. <br> Цена: <b> 3 500 руб</b>. <br>
-        <br> <b> Вечер в Париже </b> <br> Описание блюда: Филе миньон с трюфельным пюре и соусом из бордо. Гости окажутся в уютной французской уличной кафешке с видом на Эйфелеву башню и смогут услышать мелодии французских аккордеонистов. <br> Цена: <b> 4 800 руб</b>. <br>
-        <br> <b> Оазис Марокко </b> <br> Описание блюда: Тажин из баранины с кускусом и специями. Виртуальная реальность переносит гостей в уютный марокканский дворик, окружённый пальмами, с восточными ароматами и музыкой. <br> Цена: <b> 3 200 руб</b>. <br>
-        <br> Актуальное меню доступно в заведении ресторана, а также по номеру +7 (123) 456-78-90.
-"""
-    elif "доставка" in message:
-        return "Вопросы, связанные с доставкой можно решить по номеру +7 (123) 456-78-90."
-    elif "адрес" in message:
-        return "Мы находимся по адресу г. Москва, улица Донская, 8."
-    elif "пока" in message:
-        return "До свидания!"
-    else:
-        return "Я вас не понимаю. Напишите <b> помощь </b> или <b> команды </b> для полного списка команд."
\ No newline at end of file
+import re
+
+from src.core.metrics import Histogram
+from src.services.knowledge import KnowledgeBase, knowledge_base
+from src.services.matcher import IntentMatcher, IntentMatch
+
+
+STREAM_CHUNK_SIZE = 64
+
+BOT_MATCH_SECONDS = Histogram("bot_match_seconds", "Time to match a message against the intent catalogue",
+                              buckets=(0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01))
+
+
+def get_knowledge_base() -> KnowledgeBase:
+    """The current snapshot; take it once per request so the answer and its version agree."""
+    return knowledge_base.current
+
+
+def get_matcher() -> IntentMatcher:
+    return get_knowledge_base().matcher
+
+
+def match_intents(message: str, snapshot: KnowledgeBase | None = None) -> list[IntentMatch]:
+    matcher = (snapshot or get_knowledge_base()).matcher
+    with BOT_MATCH_SECONDS.time():
+        return matcher.match(message)
+
+
+def get_bot_answer(message: str, snapshot: KnowledgeBase | None = None) -> str:
+    snapshot = snapshot or get_knowledge_base()
+    matches = match_intents(message, snapshot)
+    if not matches:
+        return snapshot.fallback
+    return matches[0].intent.answer
+
+
+def split_answer(answer: str, chunk_size: int = STREAM_CHUNK_SIZE) -> list[str]:
+    """Cut an answer into chunks on whitespace so HTML tags are never split."""
+    chunks = []
+    current = ""
+    for token in re.findall(r"\S+\s*|\s+", answer):
+        if current and len(current) + len(token) > chunk_size:
+            chunks.append(current)
+            current = ""
+        current += token
+    if current:
+        chunks.append(current)
+    return chunks
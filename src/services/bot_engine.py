@@ -0,0 +1,118 @@
+import asyncio
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+import httpx
+from loguru import logger
+
+from src.core import config
+from src.core.metrics import Counter, Histogram
+from src.services import bot
+
+
+BACKEND_SECONDS = Histogram("bot_backend_seconds", "Duration of calls to the HTTP bot backend", labelnames=("result",),
+                            buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2, 5))
+FALLBACKS = Counter("bot_backend_fallbacks_total", "Replies taken from the rule engine because the backend failed",
+                    labelnames=("reason",))
+
+
+@dataclass(frozen=True)
+class BotReply:
+    text: str
+    # Knowledge base version of a rule answer, whatever the backend reports for its own
+    kb_version: str | None
+    engine: str
+
+
+class BotEngine(ABC):
+    name: str
+
+    @abstractmethod
+    async def answer(self, message: str) -> BotReply:
+        ...
+
+    async def aclose(self):
+        pass
+
+
+class RuleBotEngine(BotEngine):
+    """Keyword intents from the knowledge base; microseconds per message, so it runs on the loop."""
+    name = "rules"
+
+    async def answer(self, message: str) -> BotReply:
+        snapshot = bot.get_knowledge_base()
+        return BotReply(text=bot.get_bot_answer(message, snapshot), kb_version=snapshot.version, engine=self.name)
+
+
+class HttpBotEngine(BotEngine):
+    """Asks an HTTP backend and answers from ``fallback`` when it is slow, busy or broken.
+
+    The backend gets ``POST {"message": ...}`` and returns ``{"answer": ..., "version": ...}``
+    (``version`` is optional). ``timeout`` bounds the whole call, including the wait
+    for one of the ``max_concurrency`` slots, so a stalled backend never holds a
+    reply longer than that. Connections are pooled and kept alive up to the same limit.
+    """
+    name = "http"
+
+    def __init__(self, url: str, timeout: float, max_concurrency: int, fallback: BotEngine,
+                 transport: httpx.AsyncBaseTransport | None = None):
+        self.url = url
+        self.timeout = timeout
+        self.fallback = fallback
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._client = httpx.AsyncClient(timeout=timeout, transport=transport,
+                                         limits=httpx.Limits(max_connections=max_concurrency,
+                                                             max_keepalive_connections=max_concurrency))
+
+    async def _ask(self, message: str) -> BotReply:
+        async with self._slots:
+            response = await self._client.post(self.url, json={"message": message})
+        response.raise_for_status()
+        payload = response.json()
+        answer = payload["answer"]
+        if not isinstance(answer, str) or not answer:
+            raise ValueError("empty answer")
+        version = payload.get("version")
+        return BotReply(text=answer, kb_version=str(version) if version is not None else None, engine=self.name)
+
+    async def answer(self, message: str) -> BotReply:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        try:
+            async with asyncio.timeout(self.timeout):
+                reply = await self._ask(message)
+        except (TimeoutError, httpx.TimeoutException):
+            reason = "timeout"
+        except (httpx.HTTPError, KeyError, TypeError, ValueError) as exc:
+            reason = "error"
+            logger.warning('Бэкенд бота ответил ошибкой: {error}', error=repr(exc))
+        else:
+            BACKEND_SECONDS.observe(loop.time() - started, result="ok")
+            return reply
+        BACKEND_SECONDS.observe(loop.time() - started, result=reason)
+        FALLBACKS.inc(reason=reason)
+        return await self.fallback.answer(message)
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+bot_engine: BotEngine = RuleBotEngine()
+
+
+def start_bot_engine() -> BotEngine:
+    global bot_engine
+    if config.BOT_ENGINE not in ("rules", "http"):
+        raise ValueError(f"Unknown bot engine: {config.BOT_ENGINE}")
+    if config.BOT_ENGINE == "http":
+        if not config.BOT_BACKEND_URL:
+            raise ValueError("BOT_ENGINE=http needs BOT_BACKEND_URL")
+        bot_engine = HttpBotEngine(config.BOT_BACKEND_URL, timeout=config.BOT_BACKEND_TIMEOUT,
+                                   max_concurrency=config.BOT_BACKEND_MAX_CONCURRENCY, fallback=RuleBotEngine())
+    return bot_engine
+
+
+async def stop_bot_engine():
+    global bot_engine
+    await bot_engine.aclose()
+    bot_engine = RuleBotEngine()
@@ -0,0 +1,51 @@
+"""Stand-in for a generative bot backend, for tests and local runs of BOT_ENGINE=http.
+
+Echoes the message after ``delay`` seconds and fails with 503 on a ``fail_rate``
+share of calls; both can be changed on a running app through ``app.state``.
+
+    python -m src.services.bot_stub [--port 8100] [--delay 0.2] [--fail-rate 0.1]
+    BOT_ENGINE=http BOT_BACKEND_URL=http://127.0.0.1:8100/answer python main.py
+"""
+import argparse
+import asyncio
+import random
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+
+STUB_VERSION = "stub"
+
+
+class StubQuestion(BaseModel):
+    message: str
+
+
+def create_stub_app(delay: float = 0.0, fail_rate: float = 0.0, seed: int | None = None) -> FastAPI:
+    app = FastAPI()
+    app.state.delay = delay
+    app.state.fail_rate = fail_rate
+    app.state.calls = 0
+    rng = random.Random(seed)
+
+    @app.post("/answer")
+    async def answer(question: StubQuestion):
+        app.state.calls += 1
+        if app.state.delay:
+            await asyncio.sleep(app.state.delay)
+        if app.state.fail_rate and rng.random() < app.state.fail_rate:
+            raise HTTPException(status_code=503, detail="stub failure")
+        return {"answer": f"Эхо: {question.message}", "version": STUB_VERSION}
+
+    return app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--delay", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    uvicorn.run(create_stub_app(args.delay, args.fail_rate), host=args.host, port=args.port)
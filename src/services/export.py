@@ -0,0 +1,209 @@
+import json
+import zlib
+from functools import partial
+from typing import AsyncIterator, Callable, Iterator, Literal
+
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core import config
+from src.core.metrics import Counter
+from src.models.message import MessageExport
+import src.repositories.messages as messages_repo
+
+try:
+    import zstandard
+except ImportError:  # optional: pip install zstandard
+    zstandard = None
+
+
+EXPORTED_ROWS = Counter("history_exported_rows_total", "Messages streamed by history exports", labelnames=("format",))
+IMPORTED_ROWS = Counter("history_imported_rows_total", "Messages stored by history imports")
+
+ExportFormat = Literal["ndjson", "gzip", "zstd"]
+# media type and file extension per export format
+FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "gzip": ("application/gzip", "ndjson.gz"),
+    "zstd": ("application/zstd", "ndjson.zst"),
+}
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+# Imports decompress at most this much output per step. A zstd RLE block turns
+# 4 input bytes into up to 128 KiB, so ZSTD_INPUT_STEP bytes stay within a few MiB.
+DECOMPRESS_PIECE_BYTES = 256 * 1024
+ZSTD_INPUT_STEP = 64
+
+
+class HistoryFormatError(Exception):
+    pass
+
+
+class HistoryImportError(Exception):
+    def __init__(self, line: int, reason: str, imported: int):
+        super().__init__(f"line {line}: {reason}")
+        self.line = line
+        self.reason = reason
+        self.imported = imported
+
+
+def check_format(name: str):
+    if name == "zstd" and zstandard is None:
+        raise HistoryFormatError("zstd needs the zstandard package")
+
+
+# dumps(ensure_ascii=False) would build a new encoder for every line
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+
+
+def export_line(row: Row) -> bytes:
+    return (_encode({"session_id": row.session_id,
+                     "user_id": row.user_id,
+                     "sender_type": row.sender_type,
+                     "text": row.text,
+                     "sent_at": row.sent_at.isoformat()}) + "\n").encode()
+
+
+def compressor(name: str):
+    if name == "gzip":
+        return zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    if name == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+    return None
+
+
+async def encode_export(batches: AsyncIterator[list[Row]], name: str) -> AsyncIterator[bytes]:
+    """One NDJSON chunk per cursor batch, compressed on the fly.
+
+    Memory stays at one batch and its chunk whatever the export size.
+    """
+    packer = compressor(name)
+    exported = 0
+    try:
+        async for rows in batches:
+            chunk = b"".join(map(export_line, rows))
+            exported += len(rows)
+            if packer is not None:
+                chunk = packer.compress(chunk)
+            if chunk:
+                yield chunk
+        if packer is not None:
+            yield packer.flush()
+    finally:
+        EXPORTED_ROWS.inc(exported, format=name)
+
+
+def export_response(session: AsyncSession, name: str, filename: str,
+                    session_id: str | None = None, user_id: int | None = None) -> StreamingResponse:
+    batches = messages_repo.stream_export_batches(session, config.EXPORT_YIELD_PER,
+                                                  session_id=session_id, user_id=user_id)
+    media_type, extension = FORMATS[name]
+    return StreamingResponse(encode_export(batches, name), media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{filename}.{extension}"'})
+
+
+def gunzip_pieces(unpacker, data: bytes) -> Iterator[bytes]:
+    while True:
+        piece = unpacker.decompress(data, DECOMPRESS_PIECE_BYTES)
+        if piece:
+            yield piece
+        data = unpacker.unconsumed_tail
+        # A full piece may leave output buffered even after all input is consumed
+        if not data and len(piece) < DECOMPRESS_PIECE_BYTES:
+            return
+
+
+def unzstd_pieces(unpacker, data: bytes) -> Iterator[bytes]:
+    # decompressobj has no output limit, so the input goes in small steps instead
+    for start in range(0, len(data), ZSTD_INPUT_STEP):
+        piece = unpacker.decompress(data[start:start + ZSTD_INPUT_STEP])
+        if piece:
+            yield piece
+
+
+def decompressor(content_encoding: str | None) -> Callable[[bytes], Iterator[bytes]] | None:
+    """Splits each compressed chunk into decompressed pieces of bounded size, so a bomb never inflates at once."""
+    if content_encoding in (None, "", "identity"):
+        return None
+    if content_encoding == "gzip":
+        return partial(gunzip_pieces, zlib.decompressobj(16 + zlib.MAX_WBITS))
+    if content_encoding == "zstd" and zstandard is not None:
+        return partial(unzstd_pieces, zstandard.ZstdDecompressor().decompressobj())
+    raise HistoryFormatError(f"unsupported Content-Encoding {content_encoding}")
+
+
+def decompress(inflate: Callable[[bytes], Iterator[bytes]], chunk: bytes, content_encoding: str) -> Iterator[bytes]:
+    try:
+        yield from inflate(chunk)
+    except Exception as exc:  # zlib.error, zstandard.ZstdError
+        raise HistoryFormatError(f"corrupt {content_encoding} body") from exc
+
+
+async def iter_lines(chunks: AsyncIterator[bytes], content_encoding: str | None,
+                     max_line_bytes: int = config.IMPORT_MAX_LINE_BYTES) -> AsyncIterator[bytes]:
+    """Non-empty lines of an NDJSON body that arrives in arbitrary, possibly compressed chunks.
+
+    Raises HistoryFormatError on a line longer than ``max_line_bytes``.
+    """
+    inflate = decompressor(content_encoding)
+    # The unfinished last line; a bytearray grows in place instead of being copied per chunk
+    tail = bytearray()
+    async for chunk in chunks:
+        for piece in (chunk,) if inflate is None else decompress(inflate, chunk, content_encoding):
+            start = 0
+            while (end := piece.find(b"\n", start)) != -1:
+                tail += piece[start:end]
+                start = end + 1
+                if len(tail) > max_line_bytes:
+                    break
+                if tail.strip():
+                    yield bytes(tail)
+                tail.clear()
+            else:
+                tail += piece[start:]
+            if len(tail) > max_line_bytes:
+                raise HistoryFormatError(f"line longer than {max_line_bytes} bytes")
+    if tail.strip():
+        yield bytes(tail)
+
+
+async def import_history(session: AsyncSession, lines: AsyncIterator[bytes],
+                         batch_size: int = config.IMPORT_BATCH_SIZE) -> dict[str, int]:
+    """Store exported lines in batched inserts, one transaction per batch.
+
+    Batches before a bad line stay committed; the error tells how many rows got in.
+    """
+    imported = 0
+    sessions_created = 0
+    batch: list[MessageExport] = []
+    # Line number of each batch entry, to point at the row the database rejected
+    batch_lines: list[int] = []
+    number = 0
+
+    async def flush():
+        nonlocal imported, sessions_created
+        try:
+            sessions_created += await messages_repo.import_messages(session, batch)
+        except messages_repo.UnknownUserError as exc:
+            line = next(line for line, item in zip(batch_lines, batch) if item.user_id == exc.user_id)
+            raise HistoryImportError(line, f"unknown user {exc.user_id}", imported)
+        imported += len(batch)
+        IMPORTED_ROWS.inc(len(batch))
+        batch.clear()
+        batch_lines.clear()
+
+    async for line in lines:
+        number += 1
+        try:
+            batch.append(MessageExport.model_validate_json(line))
+        except ValidationError as exc:
+            raise HistoryImportError(number, exc.errors()[0]["msg"], imported)
+        batch_lines.append(number)
+        if len(batch) >= batch_size:
+            await flush()
+    if batch:
+        await flush()
+    return {"imported": imported, "sessions_created": sessions_created}
+
@@ -0,0 +1,60 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+from src.core import config
+from src.core.cache import TTLCache
+from src.core.metrics import Counter
+
+
+REPLAYS = Counter("idempotent_replays_total", "Duplicate submissions answered with the stored response",
+                  labelnames=("source",))
+
+# Recent responses by key. The unique index on messages stays the source of
+# truth; the cache only spares repeated retries the database round trip.
+response_cache = TTLCache("idempotency", maxsize=config.IDEMPOTENCY_CACHE_SIZE, ttl=config.IDEMPOTENCY_CACHE_TTL)
+_in_flight: dict[Hashable, asyncio.Future] = {}
+
+
+async def run_once(key: Hashable, handler: Callable[[], Awaitable[Any]]) -> Any:
+    """Run ``handler`` once per key and hand its response to every duplicate.
+
+    A duplicate that arrives while the first submission is still running waits
+    for it instead of starting a second one. Failures are not remembered, so a
+    retry after an error runs the handler again.
+    """
+    while True:
+        response = response_cache.get(key)
+        if response is not None:
+            REPLAYS.inc(source="cache")
+            return response
+        future = _in_flight.get(key)
+        if future is None:
+            break
+        try:
+            response = await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if future.cancelled():
+                # The first submission was abandoned mid-way; take over
+                continue
+            raise
+        REPLAYS.inc(source="in_flight")
+        return response
+
+    future = asyncio.get_running_loop().create_future()
+    _in_flight[key] = future
+    try:
+        response = await handler()
+    except Exception as exc:
+        future.set_exception(exc)
+        # Mark it retrieved: there may be no duplicate waiting to re-raise it
+        future.exception()
+        raise
+    except BaseException:
+        future.cancel()
+        raise
+    else:
+        future.set_result(response)
+        response_cache.set(key, response)
+        return response
+    finally:
+        del _in_flight[key]
@@ -0,0 +1,152 @@
+import asyncio
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+from loguru import logger
+
+from src.core import config
+from src.core.metrics import Counter
+from src.services.matcher import Intent, IntentMatcher
+
+
+DEFAULT_PATH = Path(__file__).with_name("knowledge_base.json")
+
+RELOADS = Counter("bot_knowledge_base_reloads_total", "Knowledge base reload attempts", labelnames=("result",))
+
+
+class KnowledgeBaseError(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class MenuItem:
+    name: str
+    description: str
+    price: int
+
+
+@dataclass(frozen=True)
+class KnowledgeBase:
+    """Immutable compiled snapshot: a request that picked one up keeps using it across a reload."""
+    version: str
+    matcher: IntentMatcher
+    fallback: str
+    menu: tuple[MenuItem, ...]
+    loaded_at: datetime
+
+
+def format_price(price: int) -> str:
+    return f"{price:,}".replace(",", " ")
+
+
+def render_menu(items: tuple[MenuItem, ...], footer: str) -> str:
+    lines = [f"<b> {item.name} </b> <br> {item.description} <br> Цена: <b> {format_price(item.price)} руб</b>. <br>"
+             for item in items]
+    return "\n<br> ".join([*lines, footer])
+
+
+def compile_knowledge_base(data: dict) -> KnowledgeBase:
+    """Validate the raw document, render answers from its records and build the matcher.
+
+    Answers may reference the restaurant fields and ``{menu}`` as str.format
+    placeholders. The version is the document's own ``version`` or a digest of
+    its content, so an unchanged file always compiles to the same version.
+    """
+    try:
+        restaurant = dict(data.get("restaurant", {}))
+        menu = tuple(MenuItem(name=item["name"], description=item["description"], price=int(item["price"]))
+                     for item in data.get("menu", ()) if item.get("available", True))
+        fields = {**restaurant, "menu": render_menu(menu, data.get("menu_footer", "").format_map(restaurant))}
+        intents = [Intent(name=item["name"],
+                          keywords=tuple(item["keywords"]),
+                          answer=item["answer"].format_map(fields),
+                          priority=priority)
+                   for priority, item in enumerate(data["intents"])]
+        fallback = data["fallback"].format_map(fields)
+    except (KeyError, TypeError, ValueError, AttributeError) as exc:
+        raise KnowledgeBaseError(f"invalid knowledge base: {exc!r}") from exc
+    if not intents:
+        raise KnowledgeBaseError("invalid knowledge base: no intents")
+
+    digest = hashlib.sha256(json.dumps(data, sort_keys=True, ensure_ascii=False).encode()).hexdigest()[:12]
+    return KnowledgeBase(version=str(data.get("version") or digest),
+                         matcher=IntentMatcher(intents),
+                         fallback=fallback,
+                         menu=menu,
+                         loaded_at=datetime.now(timezone.utc))
+
+
+def load_knowledge_base(path: Path) -> KnowledgeBase:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as exc:
+        raise KnowledgeBaseError(f"cannot read {path}: {exc}") from exc
+    return compile_knowledge_base(data)
+
+
+class KnowledgeBaseStore:
+    """Holds the current snapshot and swaps in a new one when the file changes.
+
+    A new version is compiled off the event loop and published with a single
+    assignment, so readers never see a half-built catalogue. A broken file is
+    logged and the previous version keeps serving.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._current: KnowledgeBase | None = None
+        self._signature: tuple[int, int] | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def current(self) -> KnowledgeBase:
+        if self._current is None:
+            self._signature = self._stat()
+            self._current = load_knowledge_base(self.path)
+        return self._current
+
+    def _stat(self) -> tuple[int, int] | None:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def changed(self) -> bool:
+        return self._stat() != self._signature
+
+    async def reload(self) -> KnowledgeBase:
+        """Load the file again; raises KnowledgeBaseError and keeps the old version if it is invalid."""
+        async with self._lock:
+            signature = self._stat()
+            try:
+                snapshot = await asyncio.to_thread(load_knowledge_base, self.path)
+            except KnowledgeBaseError:
+                RELOADS.inc(result="error")
+                # Don't retry the same broken file on every poll
+                self._signature = signature
+                raise
+            previous = self._current
+            self._current, self._signature = snapshot, signature
+            RELOADS.inc(result="ok")
+            if previous is None or previous.version != snapshot.version:
+                logger.info('База знаний бота обновлена: версия {version}', version=snapshot.version)
+            return snapshot
+
+    async def watch(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            if not self.changed():
+                continue
+            try:
+                await self.reload()
+            except KnowledgeBaseError:
+                logger.exception('Не удалось загрузить базу знаний бота, остается версия {version}',
+                                 version=self._current.version if self._current else None)
+
+
+knowledge_base = KnowledgeBaseStore(Path(config.KNOWLEDGE_BASE_PATH) if config.KNOWLEDGE_BASE_PATH else DEFAULT_PATH)
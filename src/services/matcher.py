@@ -0,0 +1,86 @@
+from collections import deque
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class Intent:
+    name: str
+    keywords: tuple[str, ...]
+    answer: str
+    priority: int
+
+
+@dataclass(frozen=True)
+class IntentMatch:
+    intent: Intent
+    hits: int
+
+
+class KeywordAutomaton:
+    """Aho–Corasick automaton: finds every keyword occurrence in one pass over the text."""
+
+    def __init__(self, keywords: dict[str, int]):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._output: list[tuple[int, ...]] = [()]
+
+        for keyword, value in keywords.items():
+            self._add(keyword, value)
+        self._build()
+
+    def _add(self, keyword: str, value: int):
+        state = 0
+        for char in keyword:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(())
+                self._goto[state][char] = next_state
+            state = next_state
+        self._output[state] += (value,)
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] += self._output[self._fail[next_state]]
+
+    def find_all(self, text: str) -> list[int]:
+        goto, fail, output = self._goto, self._fail, self._output
+        found = []
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.extend(output[state])
+        return found
+
+
+class IntentMatcher:
+    """Intent catalogue compiled once into a single keyword automaton."""
+
+    def __init__(self, intents: list[Intent]):
+        self.intents = sorted(intents, key=lambda intent: intent.priority)
+        keyword_owner: dict[str, int] = {}
+        for index, intent in enumerate(self.intents):
+            for keyword in intent.keywords:
+                keyword_owner.setdefault(keyword.lower(), index)
+        self._automaton = KeywordAutomaton(keyword_owner)
+
+    def match(self, text: str) -> list[IntentMatch]:
+        """Return every matched intent, ranked by catalogue priority."""
+        hits: dict[int, int] = {}
+        for index in self._automaton.find_all(text.lower()):
+            hits[index] = hits.get(index, 0) + 1
+        ranked = sorted(hits.items())
+        return [IntentMatch(intent=self.intents[index], hits=count) for index, count in ranked]
@@ -0,0 +1,192 @@
+import asyncio
+import time
+from collections import defaultdict, deque
+
+from loguru import logger
+from sqlalchemy import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.core import config
+from src.core.metrics import Counter, Gauge, Histogram
+from src.models.message import Message, MessageCreate, utcnow
+from src.repositories import sessions as sessions_repo
+
+
+PENDING_MESSAGES = Gauge("message_writer_pending", "Messages buffered and not yet committed")
+BATCH_ROWS = Histogram("message_writer_batch_rows", "Rows written per batch",
+                       buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000))
+FLUSH_SECONDS = Histogram("message_writer_flush_seconds", "Duration of one batch insert and commit")
+FAILED_MESSAGES = Counter("message_writer_failed_total", "Buffered messages the database rejected")
+
+
+class MessageWriter:
+    """Write-behind buffer that persists messages in batched inserts.
+
+    A batch is flushed once ``batch_size`` rows are buffered or ``interval``
+    seconds after the first of them arrived. With ``wait_for_commit`` the caller
+    is released only after its batch is committed (group commit); otherwise
+    ``submit`` returns as soon as the rows are buffered, and a crash loses the
+    rows of at most one unflushed window. Buffered rows stay visible through
+    ``pending`` until their commit completes, which gives read-your-writes.
+
+    The messages of one ``submit`` call form a unit that is never split across
+    transactions, so a user turn and its bot reply are saved or lost together.
+    """
+
+    def __init__(self, session_maker: async_sessionmaker,
+                 batch_size: int = config.MESSAGE_BATCH_SIZE,
+                 interval: float = config.MESSAGE_BATCH_INTERVAL_MS / 1000,
+                 max_pending: int = config.MESSAGE_MAX_PENDING,
+                 wait_for_commit: bool = config.MESSAGE_DURABILITY == "commit"):
+        self.session_maker = session_maker
+        self.batch_size = max(1, batch_size)
+        self.interval = interval
+        self.max_pending = max(self.batch_size, max_pending)
+        self.wait_for_commit = wait_for_commit
+        self._buffer: deque[list[tuple[Message, asyncio.Future | None]]] = deque()
+        self._buffered_rows = 0
+        self._by_session: dict[str, list[Message]] = defaultdict(list)
+        self._not_empty = asyncio.Event()
+        self._full = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            # Holding the lock keeps the cancellation away from a batch in the middle of its commit
+            async with self._flush_lock:
+                self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+
+    async def _run(self):
+        while True:
+            await self._not_empty.wait()
+            try:
+                await asyncio.wait_for(self._full.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    def pending(self, session_id: str) -> list[Message]:
+        """Messages of the session that are buffered or being committed, oldest first."""
+        return list(self._by_session.get(session_id, ()))
+
+    async def submit(self, *messages: MessageCreate):
+        if self._buffered_rows >= self.max_pending:
+            await self.flush()
+
+        loop = asyncio.get_running_loop()
+        unit = []
+        futures = []
+        for message_create in messages:
+            message = Message(**message_create.model_dump(), sent_at=utcnow())
+            future = loop.create_future() if self.wait_for_commit else None
+            unit.append((message, future))
+            self._by_session[message.session_id].append(message)
+            if future is not None:
+                futures.append(future)
+        self._buffer.append(unit)
+        self._buffered_rows += len(unit)
+        PENDING_MESSAGES.inc(len(messages))
+        self._not_empty.set()
+        if self._buffered_rows >= self.batch_size:
+            self._full.set()
+
+        if futures:
+            await asyncio.gather(*futures)
+
+    async def flush(self):
+        async with self._flush_lock:
+            while self._buffer:
+                # Whole units only: a batch may overshoot batch_size by the rest of its last unit
+                batch, rows = [], 0
+                while self._buffer and rows < self.batch_size:
+                    unit = self._buffer.popleft()
+                    batch.append(unit)
+                    rows += len(unit)
+                self._buffered_rows -= rows
+                if self._buffered_rows < self.batch_size:
+                    self._full.clear()
+                if not self._buffer:
+                    self._not_empty.clear()
+                await self._write(batch)
+
+    async def _write(self, batch: list[list[tuple[Message, asyncio.Future | None]]]):
+        started = time.perf_counter()
+        entries = [entry for unit in batch for entry in unit]
+        errors: list[Exception | None] = [None] * len(entries)
+        try:
+            errors = await self._insert([[message for message, _ in unit] for unit in batch])
+        finally:
+            FLUSH_SECONDS.observe(time.perf_counter() - started)
+            BATCH_ROWS.observe(len(entries))
+            PENDING_MESSAGES.dec(len(entries))
+            for (message, future), error in zip(entries, errors):
+                session_messages = self._by_session[message.session_id]
+                session_messages.remove(message)
+                if not session_messages:
+                    del self._by_session[message.session_id]
+                if future is not None and not future.done():
+                    if error is None:
+                        future.set_result(None)
+                    else:
+                        future.set_exception(error)
+
+    async def _insert(self, units: list[list[Message]]) -> list[Exception | None]:
+        """Insert and commit ``units``, returning the error of each row (``None`` once saved).
+
+        A batch rejected for its rows is split in halves along unit boundaries and
+        retried, so a bad unit costs O(log n) extra round trips and takes only
+        itself down, not its neighbours. Any other error, such as a locked or
+        unreachable database, fails the whole batch without retrying it.
+        """
+        messages = [message for unit in units for message in unit]
+        rows = [{"session_id": message.session_id,
+                 "sender_type": message.sender_type,
+                 "text": message.text,
+                 "sent_at": message.sent_at,
+                 "client_message_id": message.client_message_id} for message in messages]
+        try:
+            async with self.session_maker() as session:
+                await session.execute(insert(Message), rows)
+                await sessions_repo.record_messages(session, messages)
+                await session.commit()
+        except (IntegrityError, sessions_repo.SessionNotFoundError) as exc:
+            if len(units) > 1:
+                middle = len(units) // 2
+                return await self._insert(units[:middle]) + await self._insert(units[middle:])
+            FAILED_MESSAGES.inc(len(messages))
+            # Most likely the session was deleted on another worker; make the next request look again
+            sessions_repo.session_owner_cache.invalidate(messages[0].session_id)
+            logger.opt(exception=exc).error('Не удалось сохранить сообщение в сессии {session_id}',
+                                            session_id=messages[0].session_id)
+            return [exc] * len(messages)
+        except Exception as exc:
+            FAILED_MESSAGES.inc(len(messages))
+            logger.opt(exception=exc).error('Не удалось сохранить пакет из {count} сообщений', count=len(messages))
+            return [exc] * len(messages)
+        return [None] * len(messages)
+
+
+message_writer: MessageWriter | None = None
+
+
+def start_message_writer(session_maker: async_sessionmaker) -> MessageWriter:
+    global message_writer
+    message_writer = MessageWriter(session_maker)
+    message_writer.start()
+    return message_writer
+
+
+async def stop_message_writer():
+    global message_writer
+    if message_writer is not None:
+        await message_writer.stop()
+        message_writer = None
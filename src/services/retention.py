@@ -0,0 +1,81 @@
+import asyncio
+import time
+from datetime import timedelta
+
+from loguru import logger
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from src.core import config
+from src.core.metrics import Counter, Histogram
+from src.models.message import utcnow
+import src.repositories.messages as messages_repo
+import src.repositories.sessions as sessions_repo
+
+
+ROWS_PURGED = Counter("retention_rows_purged_total", "Rows removed by the retention purge", labelnames=("table",))
+PURGE_SECONDS = Histogram("retention_purge_seconds", "Duration of one retention purge run",
+                          buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0))
+MAINTENANCE_SECONDS = Histogram("retention_maintenance_seconds", "Duration of ANALYZE/VACUUM runs",
+                                labelnames=("operation",),
+                                buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0))
+
+
+async def purge_expired(session_maker: async_sessionmaker,
+                        max_age: timedelta,
+                        batch_size: int = config.RETENTION_BATCH_SIZE,
+                        pause: float = config.RETENTION_BATCH_PAUSE) -> dict[str, int]:
+    """Delete messages older than ``max_age``, then sessions of that age left without messages.
+
+    Every batch is its own short transaction, so the write lock is never held for long.
+    """
+    cutoff = utcnow() - max_age
+    purged = {"messages": 0, "sessions": 0}
+    with PURGE_SECONDS.time():
+        for table, delete_batch in (("messages", messages_repo.delete_messages_older_than),
+                                    ("sessions", sessions_repo.delete_empty_sessions_older_than)):
+            while True:
+                async with session_maker() as session:
+                    deleted = await delete_batch(session, cutoff, batch_size)
+                purged[table] += deleted
+                ROWS_PURGED.inc(deleted, table=table)
+                if deleted < batch_size:
+                    break
+                await asyncio.sleep(pause)
+    return purged
+
+
+async def run_maintenance(engine: AsyncEngine, vacuum: bool):
+    """Refresh planner statistics and optionally reclaim free pages."""
+    if engine.dialect.name == "sqlite":
+        statements = [("analyze", "ANALYZE")]
+        if vacuum:
+            statements.append(("vacuum", "VACUUM"))
+    elif engine.dialect.name == "postgresql":
+        operation = "vacuum" if vacuum else "analyze"
+        command = "VACUUM (ANALYZE)" if vacuum else "ANALYZE"
+        statements = [(operation, f"{command} {table}") for table in ("messages", "sessions")]
+    else:
+        return
+
+    async with engine.connect() as connection:
+        connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+        for operation, statement in statements:
+            with MAINTENANCE_SECONDS.time(operation=operation):
+                await connection.exec_driver_sql(statement)
+
+
+async def retention_loop(engine: AsyncEngine, session_maker: async_sessionmaker):
+    max_age = timedelta(days=config.RETENTION_DAYS)
+    last_vacuum = time.monotonic()
+    while True:
+        await asyncio.sleep(config.RETENTION_INTERVAL)
+        try:
+            purged = await purge_expired(session_maker, max_age)
+            vacuum = time.monotonic() - last_vacuum >= config.RETENTION_VACUUM_INTERVAL
+            if vacuum or sum(purged.values()) >= config.RETENTION_ANALYZE_THRESHOLD:
+                await run_maintenance(engine, vacuum=vacuum)
+                if vacuum:
+                    last_vacuum = time.monotonic()
+            logger.info('Очистка устаревших данных: сообщений {messages}, сессий {sessions}', **purged)
+        except Exception:
+            logger.exception('Ошибка при очистке устаревших данных')
@@ -0,0 +1,54 @@
+import html
+import re
+
+
+TOKEN_RE = re.compile(r"\w+")
+CYRILLIC_RE = re.compile(r"[а-яё]+")
+MAX_QUERY_TERMS = 8
+MIN_STEM_LENGTH = 3
+
+# Inflectional endings, longest first. unicode61 has no Russian stemmer, so
+# query words are cut to a stem and matched as prefixes: "доставка" and
+# "доставку" both become доставк*.
+RUSSIAN_ENDINGS = sorted((
+    "иями", "ями", "ами", "ого", "его", "ому", "ему", "ыми", "ими", "ов", "ев", "ей", "ой", "ый", "ий",
+    "ая", "яя", "ое", "ее", "ые", "ие", "ую", "юю", "ом", "ем", "ам", "ям", "ах", "ях", "ию", "ия", "ии",
+    "а", "я", "о", "е", "ы", "и", "у", "ю", "ь", "й",
+), key=len, reverse=True)
+
+# Private-use characters mark matches in snippets until the text is escaped.
+# Copies already in a message are swapped for the next two code points before
+# highlighting, so only the database's own markers become tags.
+HIGHLIGHT_START = "\ue000"
+HIGHLIGHT_END = "\ue001"
+STORED_HIGHLIGHT_START = "\ue002"
+STORED_HIGHLIGHT_END = "\ue003"
+
+
+def stem(term: str) -> str:
+    if CYRILLIC_RE.fullmatch(term):
+        for ending in RUSSIAN_ENDINGS:
+            if term.endswith(ending) and len(term) - len(ending) >= MIN_STEM_LENGTH:
+                return term[:-len(ending)]
+    return term
+
+
+def query_terms(query: str) -> list[str]:
+    return TOKEN_RE.findall(query.lower())[:MAX_QUERY_TERMS]
+
+
+def fts5_query(terms: list[str]) -> str:
+    """FTS5 expression matching messages that contain every term as a stem prefix."""
+    return " AND ".join(f'"{stem(term)}"*' for term in terms)
+
+
+def tsquery(terms: list[str]) -> str:
+    """PostgreSQL to_tsquery input; the russian configuration stems the terms itself."""
+    return " & ".join(f"{term}:*" for term in terms)
+
+
+def render_snippet(snippet: str) -> str:
+    """Escape message text and turn the match markers into <mark> tags."""
+    return (html.escape(snippet)
+            .replace(HIGHLIGHT_START, "<mark>")
+            .replace(HIGHLIGHT_END, "</mark>"))
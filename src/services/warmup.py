@@ -0,0 +1,47 @@
+import asyncio
+import time
+
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from src.core import config
+from src.core.hashing import hashing_pool
+from src.core.metrics import Histogram
+from src.services import bot
+import src.repositories.messages as messages_repo
+import src.repositories.sessions as sessions_repo
+
+
+WARMUP_SECONDS = Histogram("warmup_seconds", "Duration of startup warm-up steps", labelnames=("step",),
+                           buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+
+
+async def fill_pool(engine: AsyncEngine, connections: int):
+    """Open ``connections`` connections at once so the pool (and its PRAGMAs) is ready."""
+    async def ping():
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    await asyncio.gather(*(ping() for _ in range(max(1, connections))))
+
+
+async def prime_queries(session_maker: async_sessionmaker):
+    """Run the hot-path statements once: SQLAlchemy caches their compiled SQL, the database its index pages."""
+    async with session_maker() as session:
+        await sessions_repo.get_session_owner(session, "")
+        await sessions_repo.get_user_sessions_page(session, 0, 1)
+        await messages_repo.get_messages_page(session, "", 1)
+
+
+async def warm_up(engine: AsyncEngine, read_engine: AsyncEngine, read_session_maker: async_sessionmaker):
+    started = time.perf_counter()
+    with WARMUP_SECONDS.time(step="database"):
+        await asyncio.gather(fill_pool(engine, config.DB_WRITE_POOL_SIZE),
+                             fill_pool(read_engine, config.DB_READ_POOL_SIZE))
+        await prime_queries(read_session_maker)
+    with WARMUP_SECONDS.time(step="bot"):
+        bot.get_matcher()
+    with WARMUP_SECONDS.time(step="hashing"):
+        await hashing_pool.warm_up()
+    logger.info('Прогрев завершен за {seconds:.2f} с', seconds=time.perf_counter() - started)
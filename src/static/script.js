@@ -10,8 +10,10 @@ const userInput = document.getElementById("user-input");
 const typingIndicator = document.getElementById("typing-indicator");
 
 let isTyping = false;
+let historyCursor = null;
+let isLoadingHistory = false;
 
-function addMessage(text, isUser) {
+function addMessage(text, isUser, prepend = false) {
     const messageDiv = document.createElement("div");
     messageDiv.classList.add("message");
     messageDiv.classList.add(isUser ? "user-message" : "bot-message");
@@ -20,13 +22,25 @@ function addMessage(text, isUser) {
         <img src="${isUser ? userAvatar : botAvatar}" alt="${isUser ? "Аватарка пользователя" : "Аватарка бота"}" class="message-avatar">
         <div class="message-text">${text}</div>
     `;
+    if (prepend) {
+        chatMessages.prepend(messageDiv);
+        return;
+    }
     chatMessages.appendChild(messageDiv);
     chatMessages.scrollTop = chatMessages.scrollHeight;
 }
 
+function hideTypingIndicator() {
+    if (isTyping) {
+        isTyping = false;
+        typingIndicator.style.display = "none";
+    }
+}
+
 async function sendMessage(text, isUser) {
     const token = localStorage.getItem("token");
     const session_id = sessionStorage.getItem("session_id");
+    const startedAt = performance.now();
 
     try {
         const response = await fetch("/chat/message", {
@@ -42,12 +56,8 @@ async function sendMessage(text, isUser) {
             })
         });
 
-        if (isTyping) {
-            isTyping = false;
-            typingIndicator.style.display = "none";
-        }
-
         if (!response.ok) {
+            hideTypingIndicator();
             if (response.status === 401) {
                 handleTokenExpired();
             }
@@ -62,15 +72,20 @@ async function sendMessage(text, isUser) {
 
         if (isUser) {
             const json = await response.json();
+            const remainingDelay = (json.typing_delay_ms || 0) - (performance.now() - startedAt);
+            if (remainingDelay > 0) {
+                await new Promise(resolve => setTimeout(resolve, remainingDelay));
+            }
+            hideTypingIndicator();
             addMessage(json.answer);
         }
+        else {
+            hideTypingIndicator();
+        }
     }
     catch (error) {
         console.error("Ошибка при отправке сообщения:", error);
-        if (isTyping) {
-            isTyping = false;
-            typingIndicator.style.display = "none";
-        }
+        hideTypingIndicator();
         showErrorPopup("Ошибка при отправке сообщения.");
     }
 }
@@ -93,12 +108,10 @@ async function handleSendMessage() {
 }
 
 async function clearChatHistory() {
-    if (isTyping) {
-        isTyping = false;
-        typingIndicator.style.display = "none";
-    }
+    hideTypingIndicator();
 
     chatMessages.innerHTML = "";
+    historyCursor = null;
 
     const token = localStorage.getItem("token");
     const session_id = sessionStorage.getItem("session_id");
@@ -121,6 +134,9 @@ async function clearChatHistory() {
             return;
         }
 
+        sessionStorage.removeItem("session_id");
+        await createSession();
+
         addMessage(helloMessage, false);
         await sendMessage(helloMessage, false);
     }
@@ -162,11 +178,16 @@ async function createSession() {
     }
 }
 
-async function loadSessionHistory(session_id) {
+async function loadSessionHistory(session_id, before = null) {
     const token = localStorage.getItem("token");
+    const params = new URLSearchParams();
+    if (before) {
+        params.set("before", before);
+    }
 
+    isLoadingHistory = true;
     try {
-        const response = await fetch(`/chat/history/${session_id}`, {
+        const response = await fetch(`/chat/history/${session_id}?${params}`, {
             method: "GET",
             headers: {
                 "Authorization": `Bearer ${token}`
@@ -185,21 +206,49 @@ async function loadSessionHistory(session_id) {
             return;
         }
 
-        const messages = await response.json();
-        messages.forEach(message => {
-            addMessage(message.text, message.sender_type === "user");
-        });
+        const page = await response.json();
+        if (before) {
+            const previousHeight = chatMessages.scrollHeight;
+            page.items.slice().reverse().forEach(message => {
+                addMessage(message.text, message.sender_type === "user", true);
+            });
+            chatMessages.scrollTop += chatMessages.scrollHeight - previousHeight;
+        }
+        else {
+            page.items.forEach(message => {
+                addMessage(message.text, message.sender_type === "user");
+            });
+        }
+        historyCursor = page.next_cursor;
     }
     catch (error) {
         console.error("Ошибка при загрузке истории:", error);
         showErrorPopup("Ошибка при загрузке истории.");
     }
+    finally {
+        isLoadingHistory = false;
+    }
+}
+
+async function loadOlderMessages() {
+    const session_id = sessionStorage.getItem("session_id");
+    if (!session_id || !historyCursor || isLoadingHistory) {
+        return;
+    }
+
+    await loadSessionHistory(session_id, historyCursor);
 }
 
 function setListeners() {
     document.getElementById("send-button").addEventListener("click", handleSendMessage);
     document.getElementById("clear-chat").addEventListener("click", clearChatHistory)
 
+    chatMessages.addEventListener("scroll", () => {
+        if (chatMessages.scrollTop === 0) {
+            loadOlderMessages();
+        }
+    });
+
     userInput.addEventListener("keypress", (e) => {
         if (e.key === "Enter") {
             handleSendMessage();
@@ -0,0 +1,232 @@
+"""SQL profiling for API calls, and a throwaway PostgreSQL for the suite.
+
+``sql_profile.capture(label)`` records every statement any engine runs inside
+the block; ``sql_profile.check(log, max_statements)`` fails the test when a call
+goes over its statement budget or when SQLite plans a full table scan for one
+of its reads. Captured calls are listed in the terminal summary.
+
+``pytest --postgres`` runs the whole suite on a fresh PostgreSQL cluster in a
+temporary directory, started with the ``initdb`` and ``pg_ctl`` found in
+``PG_BIN`` or on PATH; without them every test is skipped. The ``postgres_url``
+fixture gives PostgreSQL-only tests a server: ``TEST_DATABASE_URL`` when it
+points at one, otherwise the same throwaway cluster, or a skip.
+"""
+import os
+import re
+import shutil
+import socket
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+
+# Plans are taken for statements that read or filter rows; plain INSERTs don't scan
+EXPLAINED = ("SELECT", "WITH", "UPDATE", "DELETE")
+# "SCAN messages" reads the whole table; "SCAN messages USING INDEX ..." and virtual tables don't
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+
+@dataclass
+class ExecutedStatement:
+    sql: str
+    seconds: float
+    plan: list[str] = field(default_factory=list)
+
+    @property
+    def full_scans(self) -> list[str]:
+        return [match.group(1) for detail in self.plan if (match := FULL_SCAN.match(detail))]
+
+
+@dataclass
+class QueryLog:
+    label: str
+    statements: list[ExecutedStatement] = field(default_factory=list)
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    @property
+    def db_seconds(self) -> float:
+        return sum(statement.seconds for statement in self.statements)
+
+    def describe(self) -> str:
+        lines = [f"{self.label}: {self.count} statements, {self.db_seconds * 1000:.2f} ms in SQL"]
+        for number, statement in enumerate(self.statements, 1):
+            lines.append(f"  {number}. {' '.join(statement.sql.split())}")
+            lines.extend(f"       {detail}" for detail in statement.plan)
+        return "\n".join(lines)
+
+
+def explain(conn, statement: str, parameters: Any, executemany: bool) -> list[str]:
+    if conn.dialect.name != "sqlite" or not statement.lstrip().upper().startswith(EXPLAINED):
+        return []
+    if executemany:
+        parameters = parameters[0]
+    # A separate cursor, so the statement's own results stay unread for SQLAlchemy
+    cursor = conn.connection.dbapi_connection.cursor()
+    try:
+        cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+        return [row[3] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+
+
+class SQLProfiler:
+    def __init__(self):
+        self.logs: list[QueryLog] = []
+        self._active: QueryLog | None = None
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self._active is not None:
+            conn.info.setdefault("profile_started", []).append(time.perf_counter())
+
+    def after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self._active is None or not conn.info.get("profile_started"):
+            return
+        elapsed = time.perf_counter() - conn.info["profile_started"].pop()
+        self._active.statements.append(ExecutedStatement(statement, elapsed,
+                                                         explain(conn, statement, parameters, executemany)))
+
+    def install(self):
+        event.listen(Engine, "before_cursor_execute", self.before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", self.after_cursor_execute)
+
+    def uninstall(self):
+        event.remove(Engine, "before_cursor_execute", self.before_cursor_execute)
+        event.remove(Engine, "after_cursor_execute", self.after_cursor_execute)
+
+    @contextmanager
+    def capture(self, label: str):
+        log = QueryLog(label)
+        self._active = log
+        try:
+            yield log
+        finally:
+            self._active = None
+            self.logs.append(log)
+
+    def check(self, log: QueryLog, max_statements: int):
+        assert log.count <= max_statements, f"over the budget of {max_statements}\n{log.describe()}"
+        scans = [table for statement in log.statements for table in statement.full_scans]
+        assert not scans, f"full scan of {', '.join(scans)}\n{log.describe()}"
+
+
+_profiler = SQLProfiler()
+
+
+@pytest.fixture(scope="session")
+def sql_profile():
+    _profiler.install()
+    yield _profiler
+    _profiler.uninstall()
+
+
+class PostgresUnavailableError(Exception):
+    pass
+
+
+class ThrowawayPostgres:
+    """A PostgreSQL cluster in a temporary directory that lives as long as the test run."""
+
+    def __init__(self):
+        self.directory: str | None = None
+        self.url: str | None = None
+
+    @staticmethod
+    def binary(name: str) -> str:
+        bin_dir = os.getenv("PG_BIN")
+        path = os.path.join(bin_dir, name) if bin_dir else shutil.which(name)
+        if not path or not os.access(path, os.X_OK):
+            raise PostgresUnavailableError(f"{name} not found, put it on PATH or set PG_BIN")
+        return path
+
+    def start(self) -> str:
+        if self.url is not None:
+            return self.url
+        initdb, pg_ctl = self.binary("initdb"), self.binary("pg_ctl")
+        directory = tempfile.mkdtemp(prefix="chatbot-test-pg-")
+        data = os.path.join(directory, "data")
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            port = probe.getsockname()[1]
+        try:
+            subprocess.run([initdb, "-D", data, "-U", "postgres", "-A", "trust", "-E", "UTF8", "--no-sync"],
+                           check=True, capture_output=True, text=True)
+            # Durability is pointless for a cluster that is thrown away
+            subprocess.run([pg_ctl, "-D", data, "-l", os.path.join(directory, "server.log"), "-w", "start", "-o",
+                            f"-p {port} -k {directory} -c listen_addresses=127.0.0.1 -c fsync=off "
+                            f"-c synchronous_commit=off -c full_page_writes=off"],
+                           check=True, capture_output=True, text=True)
+        except subprocess.CalledProcessError as exc:
+            shutil.rmtree(directory, ignore_errors=True)
+            output = (exc.stderr or exc.stdout or "").strip().splitlines()
+            raise PostgresUnavailableError(next((line for line in output if "error" in line),
+                                                f"{os.path.basename(exc.cmd[0])} failed"))
+        self.directory = directory
+        self.url = f"postgresql+asyncpg://postgres@127.0.0.1:{port}/postgres"
+        return self.url
+
+    def stop(self):
+        if self.directory is None:
+            return
+        subprocess.run([self.binary("pg_ctl"), "-D", os.path.join(self.directory, "data"), "-m", "immediate", "stop"],
+                       capture_output=True)
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.directory = self.url = None
+
+
+_postgres = ThrowawayPostgres()
+_postgres_error: str | None = None
+
+
+def pytest_addoption(parser):
+    parser.addoption("--postgres", action="store_true",
+                     help="run the tests on a throwaway PostgreSQL cluster instead of SQLite in memory")
+
+
+def pytest_configure(config):
+    global _postgres_error
+    # Before collection: test_chatbot.py builds its engine from TEST_DATABASE_URL on import
+    if config.getoption("--postgres") and "TEST_DATABASE_URL" not in os.environ:
+        try:
+            os.environ["TEST_DATABASE_URL"] = _postgres.start()
+        except PostgresUnavailableError as exc:
+            _postgres_error = str(exc)
+
+
+def pytest_collection_modifyitems(config, items):
+    if _postgres_error is not None:
+        skip = pytest.mark.skip(reason=f"PostgreSQL unavailable: {_postgres_error}")
+        for item in items:
+            item.add_marker(skip)
+
+
+def pytest_unconfigure(config):
+    _postgres.stop()
+
+
+@pytest.fixture(scope="session")
+def postgres_url() -> str:
+    url = os.getenv("TEST_DATABASE_URL", "")
+    if url.startswith("postgresql"):
+        return url
+    try:
+        return _postgres.start()
+    except PostgresUnavailableError as exc:
+        pytest.skip(f"PostgreSQL unavailable: {exc}")
+
+
+def pytest_terminal_summary(terminalreporter):
+    if not _profiler.logs:
+        return
+    terminalreporter.section("SQL per API call")
+    for log in _profiler.logs:
+        terminalreporter.write_line(f"{log.count:>4} statements {log.db_seconds * 1000:>8.2f} ms  {log.label}")